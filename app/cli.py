@@ -0,0 +1,91 @@
+"""
+Command-line maintenance tasks.
+
+Usage:
+    python -m app.cli migrate-keys
+    python -m app.cli reconcile-counters [--project PROJECT_ID]
+    python -m app.cli prune-blobs
+"""
+
+import argparse
+import sys
+
+from .config import settings
+
+
+def migrate_keys(args) -> int:
+    """Convert data_rows and ratings to integer keys."""
+    from .database import migrate_row_keys
+
+    if not settings.COMPACT_KEYS:
+        print("Set COMPACT_KEYS=true (in the environment or .env) to migrate row keys", file=sys.stderr)
+        return 1
+
+    if migrate_row_keys():
+        print("Converted data_rows and ratings to integer keys")
+    else:
+        print("Row keys are already integers; nothing to do")
+    return 0
+
+
+def reconcile(args) -> int:
+    """Recompute stored row and rating counters from the data."""
+    from .database import reconcile_counters
+
+    corrected = reconcile_counters(args.project)
+    print(f"Corrected counters on {corrected} session(s) and project(s)")
+    return 0
+
+
+def prune_blobs(args) -> int:
+    """Delete stored cell values that no row references any more."""
+    from .database import SessionLocal
+    from .models import DataRow
+    from .services.blob_store import BLOB_REF_PATTERN, blob_store
+
+    db = SessionLocal()
+    try:
+        referenced = set()
+        rows = db.query(DataRow.content).filter(DataRow.content.like("%blob://%"))
+        for (content,) in rows.yield_per(1000):
+            referenced.update(BLOB_REF_PATTERN.findall(content))
+    finally:
+        db.close()
+
+    deleted = blob_store.prune(referenced, args.min_age)
+    print(f"Deleted {deleted} unreferenced blob(s); {len(referenced)} in use")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="HITL maintenance tasks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "migrate-keys",
+        help="Convert data_rows and ratings from UUID to integer keys (requires COMPACT_KEYS=true)"
+    ).set_defaults(handler=migrate_keys)
+
+    reconcile_parser = subparsers.add_parser(
+        "reconcile-counters",
+        help="Recompute stored session and project row/rating counters"
+    )
+    reconcile_parser.add_argument("--project", help="Only reconcile this project")
+    reconcile_parser.set_defaults(handler=reconcile)
+
+    prune_parser = subparsers.add_parser(
+        "prune-blobs",
+        help="Delete out-of-line cell values left behind by deleted sessions"
+    )
+    prune_parser.add_argument(
+        "--min-age", type=int, default=3600,
+        help="Keep files newer than this many seconds (default: 3600), as ingests may still be running"
+    )
+    prune_parser.set_defaults(handler=prune_blobs)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
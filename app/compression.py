@@ -0,0 +1,279 @@
+"""
+HTTP response compression.
+
+API responses (row pages, exports, large cells) are compressed on the fly
+with brotli or gzip, whichever the client prefers; brotli is used when the
+optional brotli package is installed. Small bodies, already encoded bodies,
+partial content and formats that are compressed already (images, media,
+zip-based files) are sent as is.
+
+The frontend build is served differently: its assets are compressed once
+at build time (frontend/scripts/compress.mjs writes .br and .gz siblings),
+so requests only pick a file. Asset names carry a content hash, so they are
+cached by clients for a year. index.html is kept in memory with its
+compressed variants and revalidated by ETag instead.
+"""
+
+import gzip
+import hashlib
+import os
+import zlib
+from mimetypes import guess_type
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .services.etags import etag_matches
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+# Encodings the middleware can produce, in order of preference on equal q-values
+DYNAMIC_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Precompressed sibling suffixes written by the frontend build
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Content types that are already compressed or can't be streamed through a compressor
+UNCOMPRESSIBLE_TYPES = (
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+    "text/event-stream",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/octet-stream",
+    "application/vnd.openxmlformats",
+)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+GZIP_LEVEL = 6
+# Brotli's higher qualities are far slower; 4 compresses better than gzip -6 at similar speed
+BROTLI_QUALITY = 4
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick the content coding to use from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+        available: Codings that can be produced, most preferred first
+
+    Returns:
+        The acceptable coding with the highest q-value, or None for identity
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip()] = q
+
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits 16+ writes a gzip header and trailer
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed output isn't held back."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class CompressionMiddleware:
+    """Compresses response bodies of at least minimum_size bytes."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), DYNAMIC_ENCODINGS
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "").lower()
+                if (
+                    message["status"] < 200
+                    or message["status"] in (204, 206, 304)
+                    or "content-encoding" in headers
+                    or content_type.startswith(UNCOMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Held until the first body chunk shows whether to compress
+                    start = message
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # e.g. http.response.pathsend: the server sends the file itself
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start["headers"])
+                _add_vary(headers)
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            body = compressor.compress(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Static files that prefer build-time .br/.gz siblings and are cached as immutable."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        encoding = negotiate_encoding(
+            request_headers.get("accept-encoding", ""), PRECOMPRESSED_SUFFIXES
+        )
+        response = None
+        if encoding is not None and scope["method"] in ("GET", "HEAD"):
+            full_path, stat_result = self.lookup_path(path + PRECOMPRESSED_SUFFIXES[encoding])
+            if stat_result is not None and os.path.isfile(full_path):
+                response = FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=guess_type(path)[0] or "text/plain",
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+                )
+                if self.is_not_modified(response.headers, request_headers):
+                    response = Response(status_code=304, headers={
+                        name: value for name, value in response.headers.items()
+                        if name in ("etag", "vary", "content-encoding")
+                    })
+
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class CachedPage:
+    """A static HTML page held in memory with its compressed variants."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._variants: Optional[Dict[Optional[str], bytes]] = None
+        self._etag = ""
+
+    def _load(self) -> None:
+        with open(self.path, "rb") as f:
+            data = f.read()
+        variants = {None: data, "gzip": gzip.compress(data, compresslevel=9)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(data)
+        self._etag = '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"'
+        self._variants = variants
+
+    def response(self, request: Request) -> Response:
+        """Serve the page, compressed if the client accepts it."""
+        if self._variants is None:
+            if not os.path.isfile(self.path):
+                return PlainTextResponse("Frontend build not found", status_code=404)
+            self._load()
+
+        # Clients may reuse the page only after checking it hasn't been rebuilt
+        headers = {"ETag": self._etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request, self._etag):
+            return Response(status_code=304, headers=headers)
+
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding", ""),
+            [coding for coding in self._variants if coding is not None]
+        )
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=self._variants[encoding], media_type="text/html", headers=headers)
@@ -41,6 +41,41 @@ class Settings:
     MEDIA_DIR: str = os.getenv("MEDIA_DIR", "")
     MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", str(50 * 1024 * 1024)))  # 50MB default
 
+    # Use integer surrogate keys for data_rows and ratings instead of UUID strings.
+    # Existing databases must be converted with: python -m app.cli migrate-keys
+    COMPACT_KEYS: bool = os.getenv("COMPACT_KEYS", "false").lower() == "true"
+
+    # Ingest
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "5000"))  # Rows per bulk INSERT
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "2"))  # Concurrent background ingest jobs
+    INGEST_PROCESSES: int = int(os.getenv("INGEST_PROCESSES") or os.cpu_count() or 1)  # CSV parser processes per job
+    INGEST_PARALLEL_MIN_BYTES: int = int(os.getenv("INGEST_PARALLEL_MIN_BYTES", str(64 * 1024 * 1024)))  # 64MB default
+    INGEST_CHUNK_BYTES: int = int(os.getenv("INGEST_CHUNK_BYTES", str(16 * 1024 * 1024)))  # 16MB default
+
+    # Rater progress bitmaps
+    PROGRESS_FLUSH_SECONDS: int = int(os.getenv("PROGRESS_FLUSH_SECONDS", "30"))  # Min seconds between bitmap snapshot writes
+
+    # Ratings
+    RATING_BATCH_MAX_SIZE: int = int(os.getenv("RATING_BATCH_MAX_SIZE", "500"))  # Max ratings per batch request
+    RATING_WRITE_BUFFER: bool = os.getenv("RATING_WRITE_BUFFER", "false").lower() == "true"  # Group-commit rating writes
+    RATING_FLUSH_MS: int = int(os.getenv("RATING_FLUSH_MS", "5"))  # Max wait before a group commit
+    RATING_FLUSH_MAX_ITEMS: int = int(os.getenv("RATING_FLUSH_MAX_ITEMS", "500"))  # Queued writes that trigger a commit early
+    RATING_WRITE_ACK: str = os.getenv("RATING_WRITE_ACK", "commit")  # "commit" (durable) or "queued" (faster)
+
+    # Row content cache
+    ROW_CACHE_BYTES: int = int(os.getenv("ROW_CACHE_BYTES", str(64 * 1024 * 1024)))  # 64MB default, 0 disables
+
+    # Response compression
+    COMPRESS_MIN_BYTES: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))  # Smaller API responses are sent uncompressed
+
+    # Large cells
+    BLOB_DIR: str = os.getenv("BLOB_DIR", "")
+    CELL_INLINE_MAX_BYTES: int = int(os.getenv("CELL_INLINE_MAX_BYTES", str(32 * 1024)))  # 32KB default, 0 keeps all inline
+
+    # Resumable uploads
+    RESUMABLE_CHUNK_SIZE: int = int(os.getenv("RESUMABLE_CHUNK_SIZE", str(8 * 1024 * 1024)))  # 8MB default
+    RESUMABLE_MAX_CHUNK_SIZE: int = int(os.getenv("RESUMABLE_MAX_CHUNK_SIZE", str(64 * 1024 * 1024)))  # 64MB default
+
     @classmethod
     def get_database_url(cls) -> str:
         """Get database URL, defaulting to SQLite in data directory."""
@@ -57,6 +92,18 @@ class Settings:
         base_dir = os.path.dirname(os.path.dirname(__file__))
         return os.path.join(base_dir, "data")
 
+    @classmethod
+    def get_spool_dir(cls) -> str:
+        """Get directory for spooled uploads awaiting ingest."""
+        return os.path.join(cls.get_data_dir(), "spool")
+
+    @classmethod
+    def get_blob_dir(cls) -> str:
+        """Get directory for out-of-line cell values."""
+        if cls.BLOB_DIR:
+            return cls.BLOB_DIR
+        return os.path.join(cls.get_data_dir(), "blobs")
+
     @classmethod
     def get_media_dir(cls) -> str:
         """Get media directory path."""
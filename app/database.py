@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Integer, create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 
@@ -37,3 +37,150 @@ def init_db():
     """Initialize database tables."""
     from . import models  # Import models to register them
     Base.metadata.create_all(bind=engine)
+    added = migrate_schema()
+    check_row_keys()
+    if ("sessions", "row_count") in added:
+        # Counters start at zero on an existing database; fill them in once
+        reconcile_counters()
+
+
+def migrate_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all only creates missing tables, so existing databases need new
+    columns added explicitly. New columns must be nullable or have a
+    server_default.
+
+    Returns:
+        Set of (table, column) pairs that were added
+    """
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        default = "'" + default.replace("'", "''") + "'"
+                    ddl += f" DEFAULT {default}"
+                conn.execute(text(ddl))
+                added.add((table.name, column.name))
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    return added
+
+
+def reconcile_counters(project_id=None) -> int:
+    """Recompute stored session and project counters and commit them."""
+    from .services.counters import reconcile_counters as reconcile
+
+    db = SessionLocal()
+    try:
+        corrected = reconcile(db, project_id)
+        db.commit()
+        return corrected
+    finally:
+        db.close()
+
+
+def has_compact_row_keys() -> bool:
+    """Whether the data_rows table in the database uses integer keys."""
+    columns = inspect(engine).get_columns("data_rows")
+    id_type = next(column["type"] for column in columns if column["name"] == "id")
+    return isinstance(id_type, Integer)
+
+
+def check_row_keys():
+    """Refuse to start if the database key type doesn't match COMPACT_KEYS."""
+    if has_compact_row_keys() != settings.COMPACT_KEYS:
+        if settings.COMPACT_KEYS:
+            raise RuntimeError(
+                "COMPACT_KEYS is enabled but the database uses UUID row keys; "
+                "run 'python -m app.cli migrate-keys' first"
+            )
+        raise RuntimeError("Database uses integer row keys; set COMPACT_KEYS=true")
+
+
+def migrate_row_keys() -> bool:
+    """Convert data_rows and ratings from UUID string keys to integer keys.
+
+    Row ids are renumbered in (session_id, row_index) order and every
+    rating is pointed at its row's new id, all in one transaction. Requires
+    COMPACT_KEYS so the tables are recreated with integer key columns.
+
+    Returns:
+        True if the tables were converted, False if they already were
+    """
+    from .models import DataRow, Rating
+
+    if not settings.COMPACT_KEYS:
+        raise RuntimeError("Set COMPACT_KEYS=true before migrating row keys")
+
+    Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    if has_compact_row_keys():
+        return False
+
+    data_rows = DataRow.__table__
+    ratings = Rating.__table__
+    row_columns = [column.name for column in data_rows.columns if column.name != "id"]
+    rating_columns = [
+        column.name for column in ratings.columns if column.name not in ("id", "data_row_id")
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE data_row_keys AS SELECT id AS old_id, "
+            "ROW_NUMBER() OVER (ORDER BY session_id, row_index) AS new_id FROM data_rows"
+        ))
+        conn.execute(text("CREATE INDEX ix_data_row_keys_old_id ON data_row_keys (old_id)"))
+        conn.execute(text("CREATE TABLE data_rows_old AS SELECT * FROM data_rows"))
+        conn.execute(text("CREATE TABLE ratings_old AS SELECT * FROM ratings"))
+
+        # Recreate both tables (and their indexes) with integer key columns
+        ratings.drop(conn)
+        data_rows.drop(conn)
+        data_rows.create(conn)
+        ratings.create(conn)
+
+        conn.execute(text(
+            f"INSERT INTO data_rows (id, {', '.join(row_columns)}) "
+            f"SELECT k.new_id, {', '.join('o.' + name for name in row_columns)} "
+            "FROM data_rows_old o JOIN data_row_keys k ON k.old_id = o.id ORDER BY k.new_id"
+        ))
+        conn.execute(text(
+            f"INSERT INTO ratings (data_row_id, {', '.join(rating_columns)}) "
+            f"SELECT k.new_id, {', '.join('o.' + name for name in rating_columns)} "
+            "FROM ratings_old o JOIN data_row_keys k ON k.old_id = o.data_row_id ORDER BY o.rated_at"
+        ))
+
+        for table_name in ("data_row_keys", "data_rows_old", "ratings_old"):
+            conn.execute(text(f"DROP TABLE {table_name}"))
+
+        # Row and rating ids changed, so cached row pages must not revalidate
+        conn.execute(text("UPDATE sessions SET version = version + 1"))
+
+        if engine.dialect.name == "postgresql":
+            # Row ids were inserted explicitly, so move the sequence past them
+            conn.execute(text(
+                "SELECT setval(pg_get_serial_sequence('data_rows', 'id'), "
+                "COALESCE(MAX(id), 0) + 1, false) FROM data_rows"
+            ))
+
+    if engine.dialect.name == "sqlite":
+        # Give the space freed by the old string keys back to the filesystem
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+
+    return True
@@ -1,12 +1,16 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
+from .compression import CachedPage, CompressionMiddleware, PrecompressedStaticFiles
 from .config import settings
 from .database import init_db
-from .routers import uploads, ratings, exports, auth, projects, users, questions, media, examples
+from .routers import uploads, ratings, exports, auth, projects, users, questions, media, examples, resumable
+from .services.ingest_jobs import ingest_jobs
+from .services.progress import progress
+from .services.rating_buffer import rating_buffer
+from .services.row_cache import row_cache
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -25,14 +29,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress API responses for clients that accept gzip or brotli
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESS_MIN_BYTES)
+
 # Get base directory
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
 # React frontend build directory
 REACT_BUILD_DIR = os.path.join(BASE_DIR, "frontend", "dist")
 
-# Mount React assets
-app.mount("/assets", StaticFiles(directory=os.path.join(REACT_BUILD_DIR, "assets")), name="react-assets")
+# Mount React assets (content-hashed, served precompressed when the build provides it)
+app.mount(
+    "/assets",
+    PrecompressedStaticFiles(directory=os.path.join(REACT_BUILD_DIR, "assets")),
+    name="react-assets"
+)
+
+# SPA entry page, read once and kept in memory
+react_index = CachedPage(os.path.join(REACT_BUILD_DIR, "index.html"))
 
 @app.get("/vite.svg")
 async def serve_vite_svg():
@@ -44,6 +58,7 @@ app.include_router(projects.router)
 app.include_router(questions.router)
 app.include_router(users.router)
 app.include_router(uploads.router)
+app.include_router(resumable.router)
 app.include_router(ratings.router)
 app.include_router(exports.router)
 app.include_router(media.router)
@@ -52,8 +67,17 @@ app.include_router(examples.router)
 
 @app.on_event("startup")
 def startup():
-    """Initialize database on startup."""
+    """Initialize database and resume interrupted ingest jobs on startup."""
     init_db()
+    ingest_jobs.resume_pending()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    """Stop background ingest workers, write queued ratings and save rater progress bitmaps."""
+    ingest_jobs.shutdown()
+    rating_buffer.shutdown()
+    progress.flush()
 
 
 # ==================== Health Check ====================
@@ -71,64 +95,66 @@ async def health_check():
 
 @app.get("/api/health", tags=["health"])
 async def api_health_check():
-    """API health check endpoint."""
+    """API health check endpoint, with row content cache and rating write metrics."""
     return JSONResponse(
         content={
             "status": "healthy",
             "version": settings.APP_VERSION,
+            "row_cache": row_cache.stats(),
+            "rating_buffer": rating_buffer.stats(),
         }
     )
 
 
 # Helper function to serve React SPA
-def serve_react_spa():
+def serve_react_spa(request: Request):
     """Serve the React SPA index.html."""
-    return FileResponse(os.path.join(REACT_BUILD_DIR, "index.html"))
+    return react_index.response(request)
 
 
 # ==================== React SPA Routes ====================
 
 @app.get("/")
-async def home():
+async def home(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/login")
-async def login_page():
+async def login_page(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/register")
-async def register_page():
+async def register_page(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/dashboard")
-async def dashboard():
+async def dashboard(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/requester/dashboard")
-async def requester_dashboard():
+async def requester_dashboard(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/requester/projects/{project_id}")
-async def requester_project_detail(project_id: str):
+async def requester_project_detail(project_id: str, request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/rater/dashboard")
-async def rater_dashboard():
+async def rater_dashboard(request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/projects/{project_id}/rate")
-async def project_rate(project_id: str):
+async def project_rate(project_id: str, request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
 
 @app.get("/sessions/{session_id}/rate")
-async def session_rate(session_id: str):
+async def session_rate(session_id: str, request: Request):
     """Serve React SPA."""
-    return serve_react_spa()
+    return serve_react_spa(request)
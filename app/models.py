@@ -1,15 +1,36 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, UniqueConstraint, Boolean
+from sqlalchemy import Column, String, Integer, Text, DateTime, ForeignKey, UniqueConstraint, Boolean, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 
+from .config import settings
 from .database import Base
-from pydantic import BaseModel, Field
-from typing import Optional, List, Any
+from pydantic import BaseModel, BeforeValidator, Field
+from typing import Optional, List, Any, Dict, Annotated, Union
 
 
 # ============== SQLAlchemy ORM Models ==============
 
+# data_rows and ratings are the high-volume tables. With COMPACT_KEYS they use
+# integer autoincrement keys instead of UUID strings; the API still exposes
+# their ids as strings either way.
+RowKey = Integer if settings.COMPACT_KEYS else String
+row_key_default = None if settings.COMPACT_KEYS else (lambda: str(uuid.uuid4()))
+
+
+def parse_row_key(value: Union[str, int]) -> Optional[Union[str, int]]:
+    """Convert a data row or rating id from the API to the key column type.
+
+    Returns None if the id can't be a valid key.
+    """
+    if not settings.COMPACT_KEYS:
+        return str(value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -54,6 +75,15 @@ class Project(Base):
     # Multi-question mode
     use_multi_questions = Column(Boolean, default=False)  # If True, use questions table instead of evaluation_type
 
+    # Bumped on writes to project settings, questions, examples and assignments (see services.etags)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Rollups of the session counters (maintained by services.counters)
+    session_count = Column(Integer, nullable=False, default=0, server_default="0")
+    row_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rated_row_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationships
     owner = relationship("User", back_populates="owned_projects")
     sessions = relationship("Session", back_populates="project", cascade="all, delete-orphan")
@@ -61,6 +91,8 @@ class Project(Base):
     questions = relationship("EvaluationQuestion", back_populates="project", cascade="all, delete-orphan", order_by="EvaluationQuestion.order")
     media_files = relationship("MediaFile", back_populates="project", cascade="all, delete-orphan")
     examples = relationship("AnnotationExample", back_populates="project", cascade="all, delete-orphan", order_by="AnnotationExample.order")
+    ingest_jobs = relationship("IngestJob", back_populates="project", cascade="all, delete-orphan")
+    resumable_uploads = relationship("ResumableUpload", back_populates="project", cascade="all, delete-orphan")
 
 
 class MediaFile(Base):
@@ -139,21 +171,35 @@ class Session(Base):
     name = Column(String, nullable=False)
     filename = Column(String, nullable=False)
     columns = Column(Text, nullable=False)  # JSON array of column names
+    column_types = Column(Text, nullable=True)  # JSON: column name -> int, float, bool, text, media_ref or json
+    content_format = Column(String, nullable=False, server_default="object")  # Row content: "object" or "columnar"
+    row_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rated_row_count = Column(Integer, nullable=False, default=0, server_default="0")  # Rows with at least one rating
+    version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped on appends and rating writes
+    status = Column(String, nullable=False, default="ready", server_default="ready")  # pending while an ingest job writes rows, then ready
     project_id = Column(String, ForeignKey("projects.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     project = relationship("Project", back_populates="sessions")
     rows = relationship("DataRow", back_populates="session", cascade="all, delete-orphan")
     ratings = relationship("Rating", back_populates="session", cascade="all, delete-orphan")
+    rater_progress = relationship("RaterProgress", back_populates="session", cascade="all, delete-orphan")
 
 
 class DataRow(Base):
     __tablename__ = "data_rows"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(RowKey, primary_key=True, default=row_key_default)
     session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
     row_index = Column(Integer, nullable=False)
-    content = Column(Text, nullable=False)  # JSON object of row data
+    content = Column(Text, nullable=False)  # JSON row data (see Session.content_format)
+    content_hash = Column(String(32), nullable=True)  # Digest of content for de-duplication
+
+    __table_args__ = (
+        Index("ix_data_rows_session_row_index", "session_id", "row_index"),
+        Index("ix_data_rows_session_content_hash", "session_id", "content_hash"),
+    )
 
     session = relationship("Session", back_populates="rows")
     ratings = relationship("Rating", back_populates="data_row", cascade="all, delete-orphan")
@@ -162,8 +208,8 @@ class DataRow(Base):
 class Rating(Base):
     __tablename__ = "ratings"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    data_row_id = Column(String, ForeignKey("data_rows.id"), nullable=False)
+    id = Column(RowKey, primary_key=True, default=row_key_default)
+    data_row_id = Column(RowKey, ForeignKey("data_rows.id"), nullable=False)
     session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
     rater_id = Column(String, ForeignKey("users.id"), nullable=False)
     rating_value = Column(Integer, nullable=True)  # Kept for backward compatibility and simple queries
@@ -171,15 +217,75 @@ class Rating(Base):
     comment = Column(Text, nullable=True)
     time_spent_ms = Column(Integer, nullable=True)  # Time spent on this rating
     rated_at = Column(DateTime, default=datetime.utcnow)
+    revision = Column(Integer, nullable=False, default=1, server_default="1")  # Incremented by each update
 
     # One rating per rater per row
-    __table_args__ = (UniqueConstraint('data_row_id', 'rater_id', name='unique_rating_per_rater'),)
+    __table_args__ = (
+        UniqueConstraint('data_row_id', 'rater_id', name='unique_rating_per_rater'),
+        Index("ix_ratings_session_rater", "session_id", "rater_id"),
+    )
 
     data_row = relationship("DataRow", back_populates="ratings")
     session = relationship("Session", back_populates="ratings")
     rater = relationship("User", back_populates="ratings")
 
 
+class RaterProgress(Base):
+    """Snapshot of a rater's completion bitmap for a session (see services/progress.py)."""
+    __tablename__ = "rater_progress"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
+    rater_id = Column(String, ForeignKey("users.id"), nullable=False)
+    rated_count = Column(Integer, nullable=False)  # Bits set in bitmap
+    bitmap = Column(LargeBinary, nullable=False)  # Bit n set = row_index n rated
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint('session_id', 'rater_id', name='unique_progress_per_rater'),)
+
+    session = relationship("Session", back_populates="rater_progress")
+
+
+class IngestJob(Base):
+    """Background ingest of a spooled upload into a new session."""
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    session_id = Column(String, nullable=True)  # Pending session being written; ready once the job completes
+    session_name = Column(String, nullable=False)
+    filename = Column(String, nullable=False)  # Original uploaded filename
+    spool_path = Column(String, nullable=False)  # Spooled upload on local disk
+    status = Column(String, default="queued")  # queued, running, completed, failed
+    rows_processed = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    project = relationship("Project", back_populates="ingest_jobs")
+
+
+class ResumableUpload(Base):
+    """Chunked upload that can be resumed after a dropped connection."""
+    __tablename__ = "resumable_uploads"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    project_id = Column(String, ForeignKey("projects.id"), nullable=False)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    kind = Column(String, nullable=False)  # "dataset" or "media"
+    filename = Column(String, nullable=False)  # Original filename
+    content_type = Column(String, nullable=True)  # MIME type for media uploads
+    session_name = Column(String, nullable=True)  # Session name for dataset uploads
+    total_size = Column(Integer, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    status = Column(String, default="pending")  # pending, finalizing (claimed by a finalize call), finalized
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    project = relationship("Project", back_populates="resumable_uploads")
+
+
 # ============== Pydantic Schemas ==============
 
 # --- User Schemas ---
@@ -335,6 +441,7 @@ class SessionDetailResponse(BaseModel):
     name: str
     filename: str
     columns: List[str]
+    column_types: Optional[Dict[str, str]] = None  # Inferred at ingest; None for older sessions
     project_id: str
     project: ProjectDetailForSession
     created_at: datetime
@@ -347,8 +454,12 @@ class SessionDetailResponse(BaseModel):
 
 # --- Rating Schemas ---
 
+# Data row and rating ids are integers in compact key mode; the API keeps them as strings
+RowId = Annotated[str, BeforeValidator(str)]
+
+
 class RatingResponse(BaseModel):
-    id: str
+    id: RowId
     rating_value: Optional[int] = None
     response: Optional[dict] = None  # Flexible response for all evaluation types
     comment: Optional[str] = None
@@ -360,8 +471,12 @@ class RatingResponse(BaseModel):
         from_attributes = True
 
 
+class RatingQueuedResponse(BaseModel):
+    status: str = "queued"  # Write buffer in "queued" ack mode: accepted but not committed yet
+
+
 class DataRowResponse(BaseModel):
-    id: str
+    id: RowId
     row_index: int
     content: dict
     ratings: List[RatingResponse] = []
@@ -374,14 +489,24 @@ class DataRowResponse(BaseModel):
 class PaginatedRowsResponse(BaseModel):
     items: List[DataRowResponse]
     total: int
-    page: int
+    page: Optional[int] = None  # None in cursor mode
     per_page: int
     total_pages: int
     rated_count: int
+    next_cursor: Optional[str] = None  # Cursor mode: token for the following page, if any
+    prev_cursor: Optional[str] = None  # Cursor mode: token for the preceding page, if any
+
+
+class NextRowsResponse(BaseModel):
+    items: List[DataRowResponse]  # Next unrated rows, in row_index order
+    total: int  # Rows in the session
+    rated_count: int  # Rows rated by the current user
+    remaining: int  # Rows the current user has yet to rate
+    next_after: Optional[int] = None  # Pass as ?after= to continue past these rows
 
 
 class RatingCreate(BaseModel):
-    data_row_id: str
+    data_row_id: RowId
     session_id: str
     rating_value: Optional[int] = None  # Kept for backward compatibility
     response: Optional[dict] = None  # Flexible response for all evaluation types
@@ -389,6 +514,24 @@ class RatingCreate(BaseModel):
     time_spent_ms: Optional[int] = None
 
 
+class RatingBatchCreate(BaseModel):
+    ratings: List[RatingCreate] = Field(min_length=1, max_length=settings.RATING_BATCH_MAX_SIZE)
+
+
+class RatingBatchItemResult(BaseModel):
+    index: int  # Position of the item in the request
+    status: str  # created, updated or error
+    rating: Optional[RatingResponse] = None
+    error: Optional[str] = None
+
+
+class RatingBatchResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[RatingBatchItemResult]
+
+
 class RatingUpdate(BaseModel):
     rating_value: Optional[int] = None
     response: Optional[dict] = None
@@ -401,10 +544,53 @@ class UploadResponse(BaseModel):
     filename: str
     row_count: int
     columns: List[str]
+    column_types: Optional[Dict[str, str]] = None
     project_id: str
     message: str
 
 
+class AppendResponse(BaseModel):
+    session_id: str
+    filename: str
+    rows_added: int
+    duplicates_skipped: int
+    row_count: int
+    columns: List[str]
+    message: str
+
+
+class ColumnPreview(BaseModel):
+    content_type: str  # Most common detected content type
+    content_type_counts: Dict[str, int]
+
+
+class UploadPreviewResponse(BaseModel):
+    filename: str
+    columns: List[str]
+    rows: List[dict]
+    sample_size: int
+    estimated_row_count: Optional[int] = None  # None if it can't be estimated cheaply
+    column_types: Dict[str, ColumnPreview]
+
+
+class IngestJobResponse(BaseModel):
+    id: str
+    project_id: str
+    session_id: Optional[str] = None
+    session_name: str
+    filename: str
+    status: str
+    rows_processed: int = 0
+    rows_per_second: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # --- Evaluation Question Schemas ---
 
 class QuestionConditional(BaseModel):
@@ -553,6 +739,41 @@ class MediaContentType(BaseModel):
     label: Optional[str] = None  # Display label
 
 
+# --- Resumable Upload Schemas ---
+
+class ResumableUploadCreate(BaseModel):
+    """Start a resumable upload."""
+    kind: str = Field(pattern="^(dataset|media)$")
+    filename: str = Field(min_length=1)
+    total_size: int = Field(gt=0)
+    chunk_size: Optional[int] = Field(default=None, gt=0)  # Defaults to config
+    content_type: Optional[str] = None  # MIME type (media uploads)
+    session_name: Optional[str] = None  # Session name (dataset uploads)
+
+
+class ResumableUploadResponse(BaseModel):
+    """State of a resumable upload, including which chunks have arrived."""
+    id: str
+    project_id: str
+    kind: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    chunk_count: int
+    status: str
+    received_chunks: List[int] = []
+    missing_chunks: List[int] = []
+    bytes_received: int = 0
+    created_at: datetime
+
+
+class ResumableFinalizeResponse(BaseModel):
+    """Result of finalizing a resumable upload."""
+    upload: ResumableUploadResponse
+    ingest_job: Optional[IngestJobResponse] = None  # Dataset uploads
+    media_file: Optional[MediaFileResponse] = None  # Media uploads
+
+
 # Supported MIME types for media files
 SUPPORTED_MEDIA_TYPES = {
     # Images
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import json
@@ -10,6 +10,7 @@ from ..models import (
     AnnotationExampleResponse, ExamplesReorderRequest
 )
 from ..dependencies import get_current_user
+from ..services.etags import bump_version, etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter(prefix="/api/projects", tags=["examples"])
 
@@ -27,6 +28,8 @@ def get_project_for_owner(project_id: str, current_user: User, db: Session) -> P
 @router.get("/{project_id}/examples", response_model=List[AnnotationExampleResponse])
 async def list_examples(
     project_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -39,6 +42,11 @@ async def list_examples(
     if current_user.role == "requester" and project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    etag = make_etag("examples", project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     examples = db.query(AnnotationExample).filter(
         AnnotationExample.project_id == project_id
     ).order_by(AnnotationExample.order).all()
@@ -85,6 +93,7 @@ async def create_example(
     )
 
     db.add(db_example)
+    bump_version(db, Project, project_id)
     db.commit()
     db.refresh(db_example)
 
@@ -166,6 +175,7 @@ async def update_example(
     if update.order is not None:
         example.order = update.order
 
+    bump_version(db, Project, project_id)
     db.commit()
     db.refresh(example)
 
@@ -201,6 +211,7 @@ async def delete_example(
         raise HTTPException(status_code=404, detail="Example not found")
 
     db.delete(example)
+    bump_version(db, Project, project_id)
     db.commit()
 
     return {"message": "Example deleted"}
@@ -226,6 +237,7 @@ async def reorder_examples(
         if eid in example_map:
             example_map[eid].order = i
 
+    bump_version(db, Project, project_id)
     db.commit()
 
     return {"message": "Examples reordered"}
@@ -260,6 +272,7 @@ async def create_examples_bulk(
         db.add(db_example)
         created.append(db_example)
 
+    bump_version(db, Project, project_id)
     db.commit()
 
     return [
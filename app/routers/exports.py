@@ -8,6 +8,8 @@ import io
 from ..database import get_db
 from ..models import Session as DBSession, DataRow, ProjectAssignment, User, Rating, Project, EvaluationQuestion
 from ..dependencies import get_current_user
+from ..services.blob_store import blob_store
+from ..services.row_codec import decode_content
 
 
 def format_multi_question_response(response: dict, question: dict) -> str:
@@ -105,7 +107,9 @@ async def export_session(
     db: Session = Depends(get_db)
 ):
     """Export session data with ratings as Excel or CSV."""
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -159,12 +163,13 @@ async def export_session(
     export_data = []
 
     for row in rows:
-        content = json.loads(row.content)
+        content = decode_content(row.content, columns)
         row_data = {"Row #": row.row_index}
 
         # Add original columns
         for col in columns:
-            row_data[col] = content.get(col, "")
+            value = blob_store.resolve(content.get(col))
+            row_data[col] = "" if value is None else value
 
         # Add rating columns for each rater
         ratings_by_rater = {r.rater_id: r for r in row.ratings}
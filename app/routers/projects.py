@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -13,24 +13,19 @@ from ..models import (
     EvaluationQuestionResponse, ProjectWithQuestionsResponse
 )
 from ..dependencies import get_current_user, require_requester
+from ..services.etags import bump_version, etag_matches, make_etag, not_modified, set_etag
+from ..services.progress import progress
+from ..services.row_cache import row_cache
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
 
 def get_project_stats(project: Project, db: Session) -> dict:
-    """Get statistics for a project."""
-    session_count = len(project.sessions)
-    total_rows = 0
-    rated_rows = 0
-
-    for session in project.sessions:
-        total_rows += len(session.rows)
-        rated_rows += len(session.ratings)
-
+    """Get statistics for a project from its stored counters."""
     return {
-        "session_count": session_count,
-        "total_rows": total_rows,
-        "rated_rows": rated_rows
+        "session_count": project.session_count,
+        "total_rows": project.row_count,
+        "rated_rows": project.rating_count
     }
 
 
@@ -145,6 +140,8 @@ def get_questions_for_project(project: Project) -> list:
 @router.get("/{project_id}", response_model=ProjectWithQuestionsResponse)
 async def get_project(
     project_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -166,6 +163,15 @@ async def get_project(
         if not assignment:
             raise HTTPException(status_code=403, detail="Access denied")
 
+    # Stats are part of the response, so their counters are part of the ETag
+    etag = make_etag(
+        "project", project.id, project.version,
+        project.session_count, project.row_count, project.rating_count
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     stats = get_project_stats(project, db)
     assigned_raters = [
         UserBasic(id=a.rater.id, username=a.rater.username)
@@ -204,8 +210,12 @@ async def delete_project(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    session_ids = [session.id for session in project.sessions]
     db.delete(project)
     db.commit()
+    for session_id in session_ids:
+        progress.discard_session(session_id)
+        row_cache.invalidate_session(session_id)
 
     return {"message": "Project deleted successfully"}
 
@@ -248,6 +258,7 @@ async def update_project(
     if project_data.use_multi_questions is not None:
         project.use_multi_questions = project_data.use_multi_questions
 
+    bump_version(db, Project, project_id)
     db.commit()
     db.refresh(project)
 
@@ -311,6 +322,7 @@ async def assign_raters(
             )
             db.add(assignment)
 
+    bump_version(db, Project, project_id)
     db.commit()
 
     return {"message": "Raters assigned successfully"}
@@ -338,6 +350,7 @@ async def remove_rater(
 
     if assignment:
         db.delete(assignment)
+        bump_version(db, Project, project_id)
         db.commit()
 
     return {"message": "Rater removed successfully"}
@@ -368,13 +381,15 @@ async def get_project_sessions(
 
     sessions = []
     for session in project.sessions:
+        if session.status != "ready":
+            continue
         sessions.append({
             "id": session.id,
             "name": session.name,
             "filename": session.filename,
             "created_at": session.created_at,
-            "row_count": len(session.rows),
-            "rated_count": len(session.ratings)
+            "row_count": session.row_count,
+            "rated_count": session.rating_count
         })
 
     return sessions
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import json
@@ -10,6 +10,7 @@ from ..models import (
     EvaluationQuestionResponse, QuestionsReorderRequest
 )
 from ..dependencies import get_current_user
+from ..services.etags import bump_version, etag_matches, make_etag, not_modified, set_etag
 
 router = APIRouter(prefix="/api/projects", tags=["questions"])
 
@@ -27,6 +28,8 @@ def get_project_for_owner(project_id: str, current_user: User, db: Session) -> P
 @router.get("/{project_id}/questions", response_model=List[EvaluationQuestionResponse])
 async def list_questions(
     project_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -39,6 +42,11 @@ async def list_questions(
     if current_user.role == "requester" and project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    etag = make_etag("questions", project.id, project.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     questions = db.query(EvaluationQuestion).filter(
         EvaluationQuestion.project_id == project_id
     ).order_by(EvaluationQuestion.order).all()
@@ -101,6 +109,7 @@ async def create_question(
     # Enable multi-question mode on the project
     project.use_multi_questions = True
 
+    bump_version(db, Project, project_id)
     db.commit()
     db.refresh(db_question)
 
@@ -186,6 +195,7 @@ async def update_question(
     if update.order is not None:
         question.order = update.order
 
+    bump_version(db, Project, project_id)
     db.commit()
     db.refresh(question)
 
@@ -223,6 +233,7 @@ async def delete_question(
         raise HTTPException(status_code=404, detail="Question not found")
 
     db.delete(question)
+    bump_version(db, Project, project_id)
     db.commit()
 
     # Check if any questions remain
@@ -232,6 +243,7 @@ async def delete_question(
 
     if remaining == 0:
         project.use_multi_questions = False
+        bump_version(db, Project, project_id)
         db.commit()
 
     return {"message": "Question deleted"}
@@ -257,6 +269,7 @@ async def reorder_questions(
         if qid in question_map:
             question_map[qid].order = i
 
+    bump_version(db, Project, project_id)
     db.commit()
 
     return {"message": "Questions reordered"}
@@ -310,6 +323,7 @@ async def create_questions_bulk(
     # Enable multi-question mode
     project.use_multi_questions = True
 
+    bump_version(db, Project, project_id)
     db.commit()
 
     return [
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy import func
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
 import json
-import uuid
 import math
 
 from ..database import get_db
 from ..models import (
-    Session as DBSession, DataRow, Rating, ProjectAssignment, User,
-    RatingCreate, RatingResponse, DataRowResponse, PaginatedRowsResponse
+    Session as DBSession, DataRow, ProjectAssignment, User, parse_row_key,
+    RatingCreate, RatingResponse, RatingQueuedResponse, PaginatedRowsResponse, NextRowsResponse,
+    RatingBatchCreate, RatingBatchItemResult, RatingBatchResponse
 )
 from ..dependencies import get_current_user
+from ..services import counters
+from ..services.blob_store import blob_store, parse_blob_ref
+from ..services.etags import bump_version, etag_matches, not_modified, row_page_etag, set_etag
+from ..services.progress import progress
+from ..services.rating_buffer import rating_buffer
+from ..services.rating_writes import upsert_ratings
+from ..services.row_cache import row_cache
+from ..services.row_codec import decode_content, session_column_types
+from ..services.row_pages import (
+    fetch_cursor_page, page_query, rated_by, render_row_page, resolve_projection, row_page_response
+)
 
 router = APIRouter(prefix="/api", tags=["ratings"])
 
@@ -31,105 +45,283 @@ def check_session_access(session: DBSession, current_user: User, db: Session):
             raise HTTPException(status_code=403, detail="Access denied")
 
 
+def rating_fields(rating_data: RatingCreate) -> Tuple[Optional[int], Optional[str]]:
+    """Get (rating_value, response JSON) to store for a submitted rating."""
+    # Handle response data - extract rating_value from response if using rating type
+    response_data = rating_data.response
+    rating_value = rating_data.rating_value
+
+    # If response is provided and contains a value field, use it for rating_value
+    if response_data and "value" in response_data:
+        if isinstance(response_data["value"], int):
+            rating_value = response_data["value"]
+
+    return rating_value, json.dumps(response_data) if response_data else None
+
+
+def rating_values(rating_data: RatingCreate, data_row_id, rater_id: str) -> dict:
+    """Rating column values to upsert for a submitted rating."""
+    rating_value, response_json = rating_fields(rating_data)
+    return {
+        "data_row_id": data_row_id,
+        "session_id": rating_data.session_id,
+        "rater_id": rater_id,
+        "rating_value": rating_value,
+        "response": response_json,
+        "comment": rating_data.comment,
+        "time_spent_ms": rating_data.time_spent_ms,
+    }
+
+
+def written_rating_response(rating, rater_username: str) -> RatingResponse:
+    """RatingResponse for a rating returned by upsert_ratings."""
+    return RatingResponse(
+        id=rating.id,
+        rating_value=rating.rating_value,
+        response=json.loads(rating.response) if rating.response else None,
+        comment=rating.comment,
+        rated_at=rating.rated_at,
+        rater_id=rating.rater_id,
+        rater_username=rater_username
+    )
+
+
+def get_rater_progress(db: Session, session_id: str, rater_id: str) -> Tuple[int, int]:
+    """Get (session row total, rows rated by the rater) from the progress bitmaps."""
+    return progress.row_count(db, session_id), progress.rated_count(db, session_id, rater_id)
+
+
 @router.get("/sessions/{session_id}/rows", response_model=PaginatedRowsResponse)
 async def get_session_rows(
     session_id: str,
+    request: Request,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
     filter: Optional[str] = Query(None, pattern="^(all|rated|unrated)$"),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated content columns to return"),
+    exclude: Optional[str] = Query(None, description="Comma-separated content columns to leave out"),
+    ratings: str = Query("all", pattern="^(all|mine)$", description="mine omits other raters' ratings"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get paginated rows for a session with their ratings."""
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    """Get paginated rows for a session with their ratings.
+
+    Passing cursor switches to keyset paging: send it empty for the first
+    page, then the next_cursor or prev_cursor from the previous response.
+    Deep pages are as fast as the first. Totals come from the progress
+    bitmaps rather than counting rows. fields/exclude trim each row's
+    content to some columns, and ratings=mine leaves out other raters'
+    ratings.
+    """
+    # Before loading the session, so rows rendered from it are cached only if it's current
+    cache_generation = row_cache.generation(session_id)
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # Check access
     check_session_access(session, current_user, db)
+    columns = json.loads(session.columns)
+    projection = resolve_projection(columns, fields, exclude)
 
-    # Base query
-    query = db.query(DataRow).filter(DataRow.session_id == session_id)
+    # Base query; content is read through the row cache when rendering
+    query = page_query(db, session_id)
 
     # Apply filter based on current user's ratings
     if filter == "rated":
         # Rows that have a rating from the current user
-        rated_row_ids = db.query(Rating.data_row_id).filter(
-            Rating.session_id == session_id,
-            Rating.rater_id == current_user.id
-        ).subquery()
-        query = query.filter(DataRow.id.in_(rated_row_ids))
+        query = query.filter(rated_by(current_user.id))
     elif filter == "unrated":
         # Rows that don't have a rating from the current user
-        rated_row_ids = db.query(Rating.data_row_id).filter(
-            Rating.session_id == session_id,
-            Rating.rater_id == current_user.id
-        ).subquery()
-        query = query.filter(~DataRow.id.in_(rated_row_ids))
-
-    # Get total count
-    total = query.count()
+        query = query.filter(~rated_by(current_user.id))
+
+    # Each rater rates a row at most once, so filtered totals follow from rated_count
+    session_total, rated_count = get_rater_progress(db, session_id, current_user.id)
+    if filter == "rated":
+        total = rated_count
+    elif filter == "unrated":
+        total = max(session_total - rated_count, 0)
+    else:
+        total = session_total
     total_pages = math.ceil(total / per_page) if total > 0 else 1
 
-    # Get paginated rows
+    etag = row_page_etag(request, session, current_user.id, session_total, rated_count)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if cursor is not None:
+        rows, next_cursor, prev_cursor = fetch_cursor_page(query, session_id, cursor, per_page)
+        page_response = row_page_response(
+            render_row_page(
+                db, session_id, rows, columns, current_user.id, projection, ratings == "mine",
+                session_column_types(session), cache_generation
+            ),
+            total=total,
+            page=None,
+            per_page=per_page,
+            total_pages=total_pages,
+            rated_count=rated_count,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor
+        )
+        set_etag(page_response, etag)
+        return page_response
+
+    # Get paginated rows, then all their ratings in one batched query
     rows = query.order_by(DataRow.row_index).offset((page - 1) * per_page).limit(per_page).all()
+    items = render_row_page(
+        db, session_id, rows, columns, current_user.id, projection, ratings == "mine",
+        session_column_types(session), cache_generation
+    )
 
-    # Get count of rows rated by current user
-    rated_count = db.query(Rating).filter(
-        Rating.session_id == session_id,
-        Rating.rater_id == current_user.id
-    ).count()
-
-    # Build response
-    items = []
-    for row in rows:
-        # Get all ratings for this row
-        all_ratings = []
-        my_rating = None
-
-        for rating in row.ratings:
-            rating_response = RatingResponse(
-                id=rating.id,
-                rating_value=rating.rating_value,
-                response=json.loads(rating.response) if rating.response else None,
-                comment=rating.comment,
-                rated_at=rating.rated_at,
-                rater_id=rating.rater_id,
-                rater_username=rating.rater.username if rating.rater else None
-            )
-            all_ratings.append(rating_response)
-
-            # Check if this is the current user's rating
-            if rating.rater_id == current_user.id:
-                my_rating = rating_response
-
-        items.append(DataRowResponse(
-            id=row.id,
-            row_index=row.row_index,
-            content=json.loads(row.content),
-            ratings=all_ratings,
-            my_rating=my_rating
-        ))
-
-    return PaginatedRowsResponse(
-        items=items,
+    page_response = row_page_response(
+        items,
         total=total,
         page=page,
         per_page=per_page,
         total_pages=total_pages,
-        rated_count=rated_count
+        rated_count=rated_count,
+        next_cursor=None,
+        prev_cursor=None
+    )
+    set_etag(page_response, etag)
+    return page_response
+
+
+@router.get("/sessions/{session_id}/next", response_model=NextRowsResponse)
+async def get_next_unrated_rows(
+    session_id: str,
+    request: Request,
+    after: int = Query(0, ge=0),
+    limit: int = Query(1, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated content columns to return"),
+    exclude: Optional[str] = Query(None, description="Comma-separated content columns to leave out"),
+    ratings: str = Query("all", pattern="^(all|mine)$", description="mine omits other raters' ratings"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the next rows after a row_index that the current user hasn't rated.
+
+    Unrated row indexes are found in the rater's completion bitmap, then
+    only those rows are fetched by their (session_id, row_index) key.
+    Accepts the same fields/exclude/ratings options as the rows endpoint.
+    """
+    cache_generation = row_cache.generation(session_id)
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    check_session_access(session, current_user, db)
+    columns = json.loads(session.columns)
+    projection = resolve_projection(columns, fields, exclude)
+
+    session_total, rated_count = get_rater_progress(db, session_id, current_user.id)
+    etag = row_page_etag(request, session, current_user.id, session_total, rated_count)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    row_indexes = progress.next_unrated(db, session_id, current_user.id, after, limit)
+    rows = page_query(db, session_id).filter(
+        DataRow.row_index.in_(row_indexes)
+    ).order_by(DataRow.row_index).all() if row_indexes else []
+
+    page_response = row_page_response(
+        render_row_page(
+            db, session_id, rows, columns, current_user.id, projection, ratings == "mine",
+            session_column_types(session), cache_generation
+        ),
+        total=session_total,
+        rated_count=rated_count,
+        remaining=max(session_total - rated_count, 0),
+        next_after=rows[-1].row_index if rows else None
     )
+    set_etag(page_response, etag)
+    return page_response
 
 
-@router.post("/ratings", response_model=RatingResponse)
+@router.get("/sessions/{session_id}/rows/{row_id}/cells/{column:path}")
+async def get_row_cell(
+    session_id: str,
+    row_id: str,
+    column: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the full value of one cell.
+
+    Large cells are stored out of line and appear in row content as
+    blob://<sha256>/<size> references; this serves their value, with Range
+    support. Strings are returned as text and other values as JSON. The
+    column is matched as a path so names containing "/" work.
+    """
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    check_session_access(session, current_user, db)
+
+    key = parse_row_key(row_id)
+    content = db.query(DataRow.content).filter(
+        DataRow.id == key,
+        DataRow.session_id == session_id
+    ).scalar() if key is not None else None
+    if content is None:
+        raise HTTPException(status_code=404, detail="Row not found")
+
+    data = decode_content(content, json.loads(session.columns), session_column_types(session))
+    if column not in data:
+        raise HTTPException(status_code=404, detail="Column not found")
+
+    value = data[column]
+    ref = parse_blob_ref(value)
+    if ref is not None:
+        path = blob_store.get_path(ref[0])
+        if not path.exists():
+            raise HTTPException(status_code=404, detail="Cell value not found")
+        # Blobs are content-addressed, so a reference always means the same bytes
+        return FileResponse(
+            path,
+            media_type="text/plain; charset=utf-8",
+            headers={"Cache-Control": "private, max-age=31536000, immutable"}
+        )
+    if isinstance(value, str):
+        return PlainTextResponse(value)
+    return JSONResponse(value)
+
+
+@router.post(
+    "/ratings",
+    response_model=RatingResponse,
+    responses={202: {
+        "model": RatingQueuedResponse,
+        "description": "Rating queued by the write buffer in its \"queued\" ack mode; not committed yet",
+    }}
+)
 async def create_or_update_rating(
     rating_data: RatingCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create or update a rating for a data row (per rater)."""
+    """Create or update a rating for a data row (per rater).
+
+    With the rating write buffer enabled, the write is committed with
+    others in a group commit; see services/rating_buffer.py. In its
+    "commit" ack mode the response is the committed rating as usual. In its
+    "queued" ack mode (RATING_WRITE_ACK=queued) it is a 202
+    RatingQueuedResponse instead, sent before the rating is committed.
+    """
     # Verify data row exists
-    data_row = db.query(DataRow).filter(DataRow.id == rating_data.data_row_id).first()
+    data_row_id = parse_row_key(rating_data.data_row_id)
+    data_row = db.query(DataRow).options(
+        load_only(DataRow.id, DataRow.session_id, DataRow.row_index)
+    ).filter(DataRow.id == data_row_id).first() if data_row_id is not None else None
     if not data_row:
         raise HTTPException(status_code=404, detail="Data row not found")
 
@@ -138,67 +330,147 @@ async def create_or_update_rating(
         raise HTTPException(status_code=400, detail="Session ID mismatch")
 
     # Get session and check access
-    session = db.query(DBSession).filter(DBSession.id == rating_data.session_id).first()
+    session = db.query(DBSession).filter(
+        DBSession.id == rating_data.session_id, DBSession.status == "ready"
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
     check_session_access(session, current_user, db)
 
-    # Check for existing rating by this user for this row
-    existing = db.query(Rating).filter(
-        Rating.data_row_id == rating_data.data_row_id,
-        Rating.rater_id == current_user.id
-    ).first()
+    values = rating_values(rating_data, data_row.id, current_user.id)
+    if rating_buffer.enabled:
+        # End the read transaction so it can't hold up the group commit
+        db.close()
+        future = rating_buffer.submit(values, data_row.row_index)
+        if future is None:
+            return JSONResponse(status_code=202, content=RatingQueuedResponse().model_dump())
+        return written_rating_response(await asyncio.wrap_future(future), current_user.username)
 
-    # Handle response data - extract rating_value from response if using rating type
-    response_data = rating_data.response
-    rating_value = rating_data.rating_value
+    # Insert or update in one statement; revision 1 means it was created
+    rating = upsert_ratings(db, [values])[(data_row.id, current_user.id)]
+    created = rating.revision == 1
+    if created:
+        counters.rating_added(db, session, data_row.id)
+    bump_version(db, DBSession, session.id)
+    db.commit()
+    if created:
+        progress.mark_rated(db, session.id, current_user.id, data_row.row_index)
 
-    # If response is provided and contains a value field, use it for rating_value
-    if response_data and "value" in response_data:
-        if isinstance(response_data["value"], int):
-            rating_value = response_data["value"]
+    return written_rating_response(rating, current_user.username)
 
-    if existing:
-        # Update existing rating
-        existing.rating_value = rating_value
-        existing.response = json.dumps(response_data) if response_data else None
-        existing.comment = rating_data.comment
-        if rating_data.time_spent_ms:
-            existing.time_spent_ms = rating_data.time_spent_ms
-        db.commit()
-        db.refresh(existing)
-        return RatingResponse(
-            id=existing.id,
-            rating_value=existing.rating_value,
-            response=json.loads(existing.response) if existing.response else None,
-            comment=existing.comment,
-            rated_at=existing.rated_at,
-            rater_id=existing.rater_id,
-            rater_username=current_user.username
+
+@router.post("/ratings/batch", response_model=RatingBatchResponse)
+async def create_or_update_ratings_batch(
+    batch: RatingBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create or update many ratings in one transaction.
+
+    Each item is handled as by POST /ratings, but access is checked once per
+    session, rows are looked up with one query, all ratings are written by
+    one upsert statement, and everything is committed together. Items that fail (unknown
+    row or session, no access) are reported in their result and don't stop
+    the others. A row rated twice in one batch keeps the later rating.
+    """
+    items = batch.ratings
+    errors = {}
+    row_keys = {}
+    for index, rating_data in enumerate(items):
+        data_row_id = parse_row_key(rating_data.data_row_id)
+        if data_row_id is None:
+            errors[index] = "Data row not found"
+        else:
+            row_keys[index] = data_row_id
+
+    # Rows and sessions, one query each
+    rows = {
+        row.id: row for row in db.query(DataRow.id, DataRow.session_id, DataRow.row_index).filter(
+            DataRow.id.in_(set(row_keys.values()))
+        )
+    } if row_keys else {}
+    session_ids = {items[index].session_id for index in row_keys}
+    sessions = {
+        session.id: session
+        for session in db.query(DBSession).filter(
+            DBSession.id.in_(session_ids), DBSession.status == "ready"
         )
+    } if session_ids else {}
 
-    # Create new rating
-    new_rating = Rating(
-        id=str(uuid.uuid4()),
-        data_row_id=rating_data.data_row_id,
-        session_id=rating_data.session_id,
-        rater_id=current_user.id,
-        rating_value=rating_value,
-        response=json.dumps(response_data) if response_data else None,
-        comment=rating_data.comment,
-        time_spent_ms=rating_data.time_spent_ms
-    )
-    db.add(new_rating)
-    db.commit()
-    db.refresh(new_rating)
+    # Access check once per session
+    session_errors = {}
+    for session in sessions.values():
+        try:
+            check_session_access(session, current_user, db)
+        except HTTPException as e:
+            session_errors[session.id] = e.detail
 
-    return RatingResponse(
-        id=new_rating.id,
-        rating_value=new_rating.rating_value,
-        response=json.loads(new_rating.response) if new_rating.response else None,
-        comment=new_rating.comment,
-        rated_at=new_rating.rated_at,
-        rater_id=new_rating.rater_id,
-        rater_username=current_user.username
+    for index, data_row_id in list(row_keys.items()):
+        rating_data = items[index]
+        row = rows.get(data_row_id)
+        if row is None:
+            errors[index] = "Data row not found"
+        elif row.session_id != rating_data.session_id:
+            errors[index] = "Session ID mismatch"
+        elif rating_data.session_id not in sessions:
+            errors[index] = "Session not found"
+        elif rating_data.session_id in session_errors:
+            errors[index] = session_errors[rating_data.session_id]
+        else:
+            continue
+        del row_keys[index]
+
+    # One upsert for the batch; a row submitted more than once gets its last rating
+    values = {
+        data_row_id: rating_values(items[index], data_row_id, current_user.id)
+        for index, data_row_id in row_keys.items()
+    }
+    if rating_buffer.enabled:
+        # Queued single writes go first so they can't overwrite these later.
+        # In the threadpool, since it may wait for a group commit in progress
+        await run_in_threadpool(rating_buffer.flush)
+    written = upsert_ratings(db, list(values.values()))
+
+    statuses = {}
+    seen = set()
+    new_rows_by_session = {}
+    for index, data_row_id in row_keys.items():
+        if data_row_id in seen:
+            statuses[index] = "updated"
+        elif written[(data_row_id, current_user.id)].revision == 1:
+            statuses[index] = "created"
+            new_rows_by_session.setdefault(items[index].session_id, []).append(rows[data_row_id])
+        else:
+            statuses[index] = "updated"
+        seen.add(data_row_id)
+
+    if written:
+        for session_id, new_rows in new_rows_by_session.items():
+            counters.ratings_added(db, sessions[session_id], [row.id for row in new_rows])
+        for session_id in {items[index].session_id for index in row_keys}:
+            bump_version(db, DBSession, session_id)
+        db.commit()
+        for session_id, new_rows in new_rows_by_session.items():
+            for row in new_rows:
+                progress.mark_rated(db, session_id, current_user.id, row.row_index)
+
+    results = [
+        RatingBatchItemResult(index=index, status="error", error=errors[index]) if index in errors
+        else RatingBatchItemResult(
+            index=index,
+            status=statuses[index],
+            rating=written_rating_response(
+                written[(row_keys[index], current_user.id)], current_user.username
+            )
+        )
+        for index in range(len(items))
+    ]
+
+    created = sum(1 for status in statuses.values() if status == "created")
+    return RatingBatchResponse(
+        created=created,
+        updated=len(statuses) - created,
+        failed=len(errors),
+        results=results
     )
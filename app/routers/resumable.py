@@ -0,0 +1,312 @@
+"""
+Resumable chunked uploads for datasets and media files.
+
+Clients create an upload, PUT numbered chunks with a SHA-256 checksum, ask
+which chunks have arrived after a dropped connection, and finalize once all
+chunks are present. Finalizing hands the file to the background ingest
+runner (datasets) or to media storage (media files).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from sqlalchemy.orm import Session
+from starlette.datastructures import Headers, UploadFile
+from typing import Optional, Tuple
+import io
+import math
+
+from ..config import settings
+from ..database import get_db
+from ..models import (
+    User, Project, IngestJob, MediaFile, ResumableUpload,
+    ResumableUploadCreate, ResumableUploadResponse, ResumableFinalizeResponse,
+    MediaFileResponse, IngestJobResponse
+)
+from ..dependencies import get_current_user
+from ..services.excel_parser import check_supported_file
+from ..services.ingest_jobs import ingest_jobs
+from ..services.media_service import media_storage
+from ..services.resumable_uploads import resumable_uploads, ChunkRejectedError
+from .media import get_media_url
+from .uploads import build_job_response
+
+router = APIRouter(prefix="/api", tags=["uploads"])
+
+
+def get_chunk_count(upload: ResumableUpload) -> int:
+    """Number of chunks the upload is split into."""
+    return math.ceil(upload.total_size / upload.chunk_size)
+
+
+def get_expected_chunk_size(upload: ResumableUpload, chunk_number: int) -> int:
+    """Size a chunk must have; only the last chunk may be short."""
+    return min(upload.chunk_size, upload.total_size - chunk_number * upload.chunk_size)
+
+
+def get_upload_for_owner(upload_id: str, current_user: User, db: Session) -> ResumableUpload:
+    """Get a resumable upload and verify the current user started it."""
+    upload = db.query(ResumableUpload).filter(ResumableUpload.id == upload_id).first()
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return upload
+
+
+def build_upload_response(upload: ResumableUpload) -> ResumableUploadResponse:
+    """Build the upload state from the chunks present on disk."""
+    chunk_count = get_chunk_count(upload)
+    if upload.status == "finalized":
+        # Chunk files are discarded once the upload has been handed off
+        received = {n: get_expected_chunk_size(upload, n) for n in range(chunk_count)}
+    else:
+        received = resumable_uploads.received_chunks(upload.id)
+
+    return ResumableUploadResponse(
+        id=upload.id,
+        project_id=upload.project_id,
+        kind=upload.kind,
+        filename=upload.filename,
+        total_size=upload.total_size,
+        chunk_size=upload.chunk_size,
+        chunk_count=chunk_count,
+        status=upload.status,
+        received_chunks=sorted(received),
+        missing_chunks=[n for n in range(chunk_count) if n not in received],
+        bytes_received=sum(received.values()),
+        created_at=upload.created_at
+    )
+
+
+@router.post("/projects/{project_id}/resumable-uploads", response_model=ResumableUploadResponse)
+async def create_resumable_upload(
+    project_id: str,
+    upload_data: ResumableUploadCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload of a dataset or media file (owner only)."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    if upload_data.total_size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Upload size cannot exceed {settings.MAX_UPLOAD_SIZE} bytes"
+        )
+
+    chunk_size = upload_data.chunk_size or settings.RESUMABLE_CHUNK_SIZE
+    if chunk_size > settings.RESUMABLE_MAX_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Chunk size cannot exceed {settings.RESUMABLE_MAX_CHUNK_SIZE} bytes"
+        )
+
+    content_type = None
+    if upload_data.kind == "dataset":
+        check_supported_file(upload_data.filename)
+    else:
+        # Validate media type up front rather than after the whole file is sent
+        headers = Headers({"content-type": upload_data.content_type}) if upload_data.content_type else None
+        is_valid, content_type, error = media_storage.validate_file(
+            UploadFile(file=io.BytesIO(), filename=upload_data.filename, headers=headers)
+        )
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error)
+
+    upload = ResumableUpload(
+        project_id=project_id,
+        owner_id=current_user.id,
+        kind=upload_data.kind,
+        filename=upload_data.filename,
+        content_type=content_type,
+        session_name=upload_data.session_name,
+        total_size=upload_data.total_size,
+        chunk_size=chunk_size
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    return build_upload_response(upload)
+
+
+@router.get("/resumable-uploads/{upload_id}", response_model=ResumableUploadResponse)
+async def get_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get upload state, including which chunks were received."""
+    upload = get_upload_for_owner(upload_id, current_user, db)
+    return build_upload_response(upload)
+
+
+@router.put("/resumable-uploads/{upload_id}/chunks/{chunk_number}", response_model=ResumableUploadResponse)
+async def put_chunk(
+    upload_id: str,
+    chunk_number: int,
+    request: Request,
+    x_chunk_sha256: str = Header(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload one chunk as the raw request body with its SHA-256 checksum.
+
+    Re-sending a chunk replaces it, so clients can retry freely.
+    """
+    upload = get_upload_for_owner(upload_id, current_user, db)
+    if upload.status != "pending":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    if chunk_number < 0 or chunk_number >= get_chunk_count(upload):
+        raise HTTPException(status_code=400, detail="Chunk number out of range")
+
+    try:
+        await resumable_uploads.write_chunk(
+            upload.id, chunk_number, request.stream(), x_chunk_sha256,
+            expected_size=get_expected_chunk_size(upload, chunk_number)
+        )
+    except ChunkRejectedError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return build_upload_response(upload)
+
+
+async def hand_off_upload(
+    upload: ResumableUpload,
+    chunk_count: int,
+    request: Request,
+    current_user: User,
+    db: Session
+) -> Tuple[Optional[IngestJobResponse], Optional[MediaFileResponse]]:
+    """Queue a claimed dataset upload for ingest, or save a media upload, and mark it finalized.
+
+    Returns:
+        Tuple of (ingest_job, media_file); the one that doesn't apply is None
+    """
+    ingest_job = None
+    media_response = None
+
+    if upload.kind == "dataset":
+        spool_path = ingest_jobs.new_spool_path(upload.filename)
+        resumable_uploads.assemble(upload.id, chunk_count, spool_path)
+
+        job = IngestJob(
+            project_id=upload.project_id,
+            owner_id=current_user.id,
+            session_name=upload.session_name or upload.filename.rsplit('.', 1)[0],
+            filename=upload.filename,
+            spool_path=spool_path
+        )
+        db.add(job)
+        upload.status = "finalized"
+        db.commit()
+        db.refresh(job)
+
+        ingest_jobs.submit(job.id)
+        ingest_job = build_job_response(job)
+
+    else:
+        with resumable_uploads.open_reader(upload.id, chunk_count) as reader:
+            stored_filename, storage_path, size_bytes = await media_storage.save_file(
+                UploadFile(file=reader, filename=upload.filename), upload.project_id
+            )
+
+        media_file = MediaFile(
+            project_id=upload.project_id,
+            filename=stored_filename,
+            original_name=upload.filename,
+            mime_type=upload.content_type,
+            size_bytes=size_bytes,
+            storage_path=storage_path
+        )
+        db.add(media_file)
+        upload.status = "finalized"
+        db.commit()
+        db.refresh(media_file)
+
+        media_response = MediaFileResponse(
+            id=media_file.id,
+            project_id=media_file.project_id,
+            filename=media_file.filename,
+            original_name=media_file.original_name,
+            mime_type=media_file.mime_type,
+            size_bytes=media_file.size_bytes,
+            storage_path=media_file.storage_path,
+            url=get_media_url(request, media_file.id),
+            created_at=media_file.created_at
+        )
+
+    return ingest_job, media_response
+
+
+@router.post("/resumable-uploads/{upload_id}/finalize", response_model=ResumableFinalizeResponse)
+async def finalize_resumable_upload(
+    upload_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Finish an upload once every chunk has arrived.
+
+    Datasets are queued as a background ingest job; media files are saved
+    to media storage.
+    """
+    upload = get_upload_for_owner(upload_id, current_user, db)
+    if upload.status != "pending":
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    state = build_upload_response(upload)
+    if state.missing_chunks:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Upload is incomplete", "missing_chunks": state.missing_chunks}
+        )
+
+    # Claim the upload so concurrent finalize calls can't both build it
+    claimed = db.query(ResumableUpload).filter(
+        ResumableUpload.id == upload.id, ResumableUpload.status == "pending"
+    ).update({ResumableUpload.status: "finalizing"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    try:
+        ingest_job, media_response = await hand_off_upload(upload, state.chunk_count, request, current_user, db)
+    except Exception:
+        # Release the claim so the client can retry
+        db.rollback()
+        db.query(ResumableUpload).filter(
+            ResumableUpload.id == upload.id, ResumableUpload.status == "finalizing"
+        ).update({ResumableUpload.status: "pending"}, synchronize_session=False)
+        db.commit()
+        raise
+
+    resumable_uploads.discard(upload.id)
+    db.refresh(upload)
+
+    return ResumableFinalizeResponse(
+        upload=build_upload_response(upload),
+        ingest_job=ingest_job,
+        media_file=media_response
+    )
+
+
+@router.delete("/resumable-uploads/{upload_id}")
+async def abort_resumable_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Abort an upload and discard its chunks."""
+    upload = get_upload_for_owner(upload_id, current_user, db)
+    if upload.status == "finalizing":
+        raise HTTPException(status_code=409, detail="Upload is being finalized")
+
+    resumable_uploads.discard(upload.id)
+    db.delete(upload)
+    db.commit()
+
+    return {"message": "Upload aborted"}
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional, List
+from datetime import datetime
 import json
-import uuid
 
 from ..database import get_db
 from ..models import (
-    Session as DBSession, DataRow, Project, ProjectAssignment, User,
-    UploadResponse, SessionListItem, SessionDetailResponse, ProjectDetailForSession
+    Session as DBSession, Project, ProjectAssignment, User, IngestJob,
+    UploadResponse, SessionListItem, SessionDetailResponse, ProjectDetailForSession,
+    IngestJobResponse, AppendResponse, UploadPreviewResponse
 )
-from ..services.excel_parser import parse_file
+from ..services import counters
+from ..services.blob_store import blob_store
+from ..services.etags import bump_version, etag_matches, make_etag, not_modified, set_etag
+from ..services.excel_parser import parse_file, check_supported_file
+from ..services.ingest import append_rows, create_session
+from ..services.ingest_jobs import ingest_jobs
+from ..services.preview import preview_file
+from ..services.row_codec import RowEncoder, CONTENT_FORMAT_COLUMNAR, get_session_encoder, session_column_types
+from ..services.progress import progress
+from ..services.row_cache import row_cache
 from ..dependencies import get_current_user, require_requester
 
 router = APIRouter(prefix="/api", tags=["uploads"])
@@ -31,28 +41,15 @@ async def upload_file(
     if project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    # Parse file (Excel or CSV)
+    # Parse file header (Excel or CSV); rows are streamed below
     parsed = parse_file(file)
+    encoder = RowEncoder(parsed["columns"], coerce_strings=parsed["string_values"], blob_store=blob_store)
 
-    # Create session
-    session = DBSession(
-        id=str(uuid.uuid4()),
-        name=session_name or file.filename.rsplit('.', 1)[0],
-        filename=file.filename,
-        columns=json.dumps(parsed["columns"]),
-        project_id=project_id
+    # Stream rows into bulk inserts in the same transaction as the session
+    session, row_count = create_session(
+        db, project_id, session_name or file.filename.rsplit('.', 1)[0], file.filename,
+        encoder, encoder.encode_rows(parsed["rows"])
     )
-    db.add(session)
-
-    # Create data rows
-    for row_data in parsed["rows"]:
-        data_row = DataRow(
-            id=str(uuid.uuid4()),
-            session_id=session.id,
-            row_index=row_data["row_index"],
-            content=row_data["content"]
-        )
-        db.add(data_row)
 
     db.commit()
     db.refresh(session)
@@ -61,21 +58,200 @@ async def upload_file(
         session_id=session.id,
         session_name=session.name,
         filename=session.filename,
-        row_count=parsed["row_count"],
-        columns=parsed["columns"],
+        row_count=row_count,
+        columns=encoder.columns,
+        column_types=encoder.get_column_types(),
         project_id=project_id,
         message="Upload successful"
     )
 
 
+@router.post("/projects/{project_id}/upload/preview", response_model=UploadPreviewResponse)
+async def preview_upload(
+    project_id: str,
+    file: UploadFile = File(...),
+    rows: int = Form(20, ge=1, le=1000),
+    file_size: Optional[int] = Form(None, ge=1),
+    current_user: User = Depends(require_requester),
+    db: Session = Depends(get_db)
+):
+    """Preview the header and first rows of a file without ingesting it (owner only).
+
+    Clients may send just the head of a large CSV or JSONL file along with
+    its full file_size; the row count is then estimated for the whole file.
+    Excel, Parquet and Arrow files must be sent whole.
+    """
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    preview = preview_file(file, rows, file_size)
+
+    return UploadPreviewResponse(
+        filename=file.filename,
+        columns=preview["columns"],
+        rows=preview["rows"],
+        sample_size=len(preview["rows"]),
+        estimated_row_count=preview["estimated_row_count"],
+        column_types=preview["column_types"]
+    )
+
+
+@router.post("/sessions/{session_id}/append", response_model=AppendResponse)
+async def append_to_session(
+    session_id: str,
+    file: UploadFile = File(...),
+    current_user: User = Depends(require_requester),
+    db: Session = Depends(get_db)
+):
+    """Append rows from a file to an existing session, skipping duplicates (owner only)."""
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if session.project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    parsed = parse_file(file)
+    encoder = get_session_encoder(session, coerce_strings=parsed["string_values"], blob_store=blob_store)
+    rows_added, duplicates_skipped = append_rows(db, session.id, encoder.encode_rows(parsed["rows"]))
+
+    # Keep existing column order; new columns were added at the end
+    columns = encoder.columns
+    columns += [col for col in parsed["columns"] if col not in columns]
+    session.columns = json.dumps(columns)
+    if session.content_format == CONTENT_FORMAT_COLUMNAR:
+        session.column_types = json.dumps(encoder.get_column_types())
+    counters.rows_added(db, session, rows_added)
+    bump_version(db, DBSession, session.id)
+
+    db.commit()
+    progress.invalidate_rows(session.id)
+    row_cache.invalidate_session(session.id)
+
+    return AppendResponse(
+        session_id=session.id,
+        filename=file.filename,
+        rows_added=rows_added,
+        duplicates_skipped=duplicates_skipped,
+        row_count=session.row_count,
+        columns=columns,
+        message=f"Appended {rows_added} row(s), skipped {duplicates_skipped} duplicate(s)"
+    )
+
+
+def build_job_response(job: IngestJob) -> IngestJobResponse:
+    """Build an ingest job response with live progress and throughput."""
+    rows_processed = ingest_jobs.rows_processed(job)
+
+    rows_per_second = None
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+        if elapsed > 0:
+            rows_per_second = round(rows_processed / elapsed, 1)
+
+    return IngestJobResponse(
+        id=job.id,
+        project_id=job.project_id,
+        # The session stays hidden until the job completes
+        session_id=job.session_id if job.status == "completed" else None,
+        session_name=job.session_name,
+        filename=job.filename,
+        status=job.status,
+        rows_processed=rows_processed,
+        rows_per_second=rows_per_second,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+
+@router.post("/projects/{project_id}/upload/jobs", response_model=IngestJobResponse, status_code=202)
+async def create_ingest_job(
+    project_id: str,
+    file: UploadFile = File(...),
+    session_name: Optional[str] = Form(None),
+    current_user: User = Depends(require_requester),
+    db: Session = Depends(get_db)
+):
+    """Spool an upload to disk and ingest it in the background (requester only)."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    check_supported_file(file.filename)
+    spool_path = await ingest_jobs.spool_upload(file)
+
+    job = IngestJob(
+        project_id=project_id,
+        owner_id=current_user.id,
+        session_name=session_name or file.filename.rsplit('.', 1)[0],
+        filename=file.filename,
+        spool_path=spool_path
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    ingest_jobs.submit(job.id)
+
+    return build_job_response(job)
+
+
+@router.get("/projects/{project_id}/upload/jobs", response_model=List[IngestJobResponse])
+async def list_ingest_jobs(
+    project_id: str,
+    current_user: User = Depends(require_requester),
+    db: Session = Depends(get_db)
+):
+    """List background ingest jobs for a project (owner only)."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if project.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    jobs = db.query(IngestJob).filter(
+        IngestJob.project_id == project_id
+    ).order_by(IngestJob.created_at.desc()).all()
+
+    return [build_job_response(job) for job in jobs]
+
+
+@router.get("/upload/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: str,
+    current_user: User = Depends(require_requester),
+    db: Session = Depends(get_db)
+):
+    """Poll a background ingest job for progress (owner only)."""
+    job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    if job.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    return build_job_response(job)
+
+
 @router.get("/sessions/{session_id}", response_model=SessionDetailResponse)
 async def get_session(
     session_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get session details with project info."""
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -92,6 +268,14 @@ async def get_session(
         if not assignment:
             raise HTTPException(status_code=403, detail="Access denied")
 
+    # The response embeds project settings and questions, and the session's counts
+    etag = make_etag(
+        "session", session.id, session.version, session.row_count, session.rating_count, project.version
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+
     # Build questions list if multi-question mode
     questions = []
     if project.use_multi_questions and project.questions:
@@ -115,6 +299,7 @@ async def get_session(
         name=session.name,
         filename=session.filename,
         columns=json.loads(session.columns),
+        column_types=session_column_types(session),
         project_id=session.project_id,
         project=ProjectDetailForSession(
             id=project.id,
@@ -126,8 +311,8 @@ async def get_session(
             questions=questions
         ),
         created_at=session.created_at,
-        row_count=len(session.rows),
-        rated_count=len(session.ratings)
+        row_count=session.row_count,
+        rated_count=session.rating_count
     )
 
 
@@ -138,7 +323,9 @@ async def delete_session(
     db: Session = Depends(get_db)
 ):
     """Delete a session and all its data (owner only)."""
-    session = db.query(DBSession).filter(DBSession.id == session_id).first()
+    session = db.query(DBSession).filter(
+        DBSession.id == session_id, DBSession.status == "ready"
+    ).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
@@ -146,7 +333,10 @@ async def delete_session(
     if session.project.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
+    counters.session_deleted(db, session)
     db.delete(session)
     db.commit()
+    progress.discard_session(session_id)
+    row_cache.invalidate_session(session_id)
 
     return {"message": "Session deleted successfully"}
@@ -0,0 +1,125 @@
+"""
+Content-addressed storage for large cell values.
+
+At ingest, string cells larger than CELL_INLINE_MAX_BYTES are written to a
+file named by the SHA-256 of their UTF-8 bytes, and the row stores a
+reference of the form blob://<sha256>/<size in bytes> instead. Row content
+then stays small for page reads, and identical values (e.g. the same image
+data URL on many rows) are stored once. Full values are served on demand
+by the cell endpoint.
+
+Cell text that itself starts with blob:// is always stored as a blob, so
+every stored string of that form is a reference the store wrote, never
+user text.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+from ..config import settings
+
+BLOB_PREFIX = "blob://"
+# A whole reference, or (with findall) the references inside stored row content JSON
+BLOB_REF_PATTERN = re.compile(r"blob://([0-9a-f]{64})/[0-9]+")
+
+
+def parse_blob_ref(value) -> Optional[Tuple[str, int]]:
+    """Split a blob reference into (digest, size), or None if it isn't one."""
+    if not isinstance(value, str):
+        return None
+    match = BLOB_REF_PATTERN.fullmatch(value)
+    if match is None:
+        return None
+    return match.group(1), int(value.rpartition("/")[2])
+
+
+class BlobStore:
+    """Stores large cell values as files named by their content hash."""
+
+    def __init__(self, base_path: Optional[str] = None, inline_max_bytes: Optional[int] = None):
+        """Initialize the blob store.
+
+        Args:
+            base_path: Directory for blob files (defaults to config)
+            inline_max_bytes: Largest cell kept in the row; 0 keeps all cells inline except
+                those that look like references (defaults to config)
+        """
+        self.base_path = Path(base_path) if base_path else Path(settings.get_blob_dir())
+        self.inline_max_bytes = (
+            inline_max_bytes if inline_max_bytes is not None else settings.CELL_INLINE_MAX_BYTES
+        )
+
+    def get_path(self, digest: str) -> Path:
+        """Path of the file for a digest, fanned out by its first two characters."""
+        return self.base_path / digest[:2] / digest
+
+    def put(self, value: str) -> str:
+        """Store a value and return its reference."""
+        data = value.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.get_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so concurrent ingests never see a partial blob
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        return f"{BLOB_PREFIX}{digest}/{len(data)}"
+
+    def offload(self, value):
+        """Replace a string too large to keep inline with a blob reference.
+
+        Strings starting with BLOB_PREFIX are stored as blobs whatever their
+        size, so user text is never mistaken for a reference.
+        """
+        if not isinstance(value, str):
+            return value
+        if value.startswith(BLOB_PREFIX) or (
+            self.inline_max_bytes
+            # Cheap pre-check: UTF-8 takes at least one byte per character
+            and len(value) > self.inline_max_bytes // 4
+            and len(value.encode("utf-8")) > self.inline_max_bytes
+        ):
+            return self.put(value)
+        return value
+
+    def resolve(self, value):
+        """Full value for a cell, reading it back if it is a blob reference."""
+        ref = parse_blob_ref(value)
+        if ref is None:
+            return value
+        return self.get_path(ref[0]).read_text(encoding="utf-8")
+
+    def prune(self, referenced: Set[str], min_age_seconds: int = 3600) -> int:
+        """Delete blob files whose digest isn't referenced.
+
+        Files younger than min_age_seconds are kept, since an ingest that
+        wrote them may not have committed its rows yet.
+
+        Returns:
+            Number of files deleted
+        """
+        if not self.base_path.exists():
+            return 0
+        cutoff = time.time() - min_age_seconds
+        deleted = 0
+        for path in self.base_path.glob("*/*"):
+            if path.name in referenced or path.stat().st_mtime > cutoff:
+                continue
+            path.unlink(missing_ok=True)
+            deleted += 1
+        return deleted
+
+
+# Module-level instance
+blob_store = BlobStore()
@@ -0,0 +1,154 @@
+"""
+Stored row and rating counters for sessions and projects.
+
+Sessions keep row_count, rating_count and rated_row_count (rows with at
+least one rating), and projects keep the sums of those over their sessions
+plus a session_count. Counters are adjusted with relative UPDATEs in the
+same transaction as the change they describe, so concurrent writers don't
+overwrite each other and a rolled back change leaves them untouched.
+reconcile_counters recomputes them from the data for databases that
+predate the counters or have drifted.
+"""
+
+from collections import Counter, defaultdict
+from typing import List, Optional
+
+from sqlalchemy import distinct, func, select, update
+from sqlalchemy.orm import Session
+
+from ..models import DataRow, Project, Rating, Session as DBSession
+
+SESSION_COUNTERS = ("row_count", "rating_count", "rated_row_count")
+PROJECT_COUNTERS = ("session_count",) + SESSION_COUNTERS
+
+
+def _increment(db: Session, model, key: str, **deltas) -> None:
+    """Add to counter columns of one row with a single UPDATE."""
+    table = model.__table__
+    db.execute(
+        update(table).where(table.c.id == key).values(
+            {name: table.c[name] + delta for name, delta in deltas.items()}
+        )
+    )
+
+
+def session_created(db: Session, session: DBSession, row_count: int) -> None:
+    """Count a new session and its initial rows."""
+    _increment(db, DBSession, session.id, row_count=row_count)
+    _increment(db, Project, session.project_id, session_count=1, row_count=row_count)
+
+
+def rows_added(db: Session, session: DBSession, row_count: int) -> None:
+    """Count rows appended to a session."""
+    if row_count:
+        _increment(db, DBSession, session.id, row_count=row_count)
+        _increment(db, Project, session.project_id, row_count=row_count)
+
+
+def rating_added(db: Session, session: DBSession, data_row_id) -> None:
+    """Count a new rating; call after it has been flushed."""
+    ratings_added(db, session, [data_row_id])
+
+
+def ratings_added(db: Session, session: DBSession, data_row_ids: List) -> None:
+    """Count new ratings in a session; call after they have been flushed.
+
+    Args:
+        db: Database session
+        session: Session the ratings belong to
+        data_row_ids: Row of each new rating (repeated for rows given
+            several new ratings, e.g. by different raters)
+
+    A row counts as newly rated if the new ratings are now its only ones.
+    That is checked inside the UPDATE, after the insert, so two writers
+    rating the same row at once can't both count it.
+    """
+    if not data_row_ids:
+        return
+    # Rows grouped by how many of their ratings are new
+    rows_by_new_count = defaultdict(list)
+    for data_row_id, new_count in Counter(data_row_ids).items():
+        rows_by_new_count[new_count].append(data_row_id)
+
+    first_ratings = 0
+    for new_count, row_ids in rows_by_new_count.items():
+        first_ratings = first_ratings + select(func.count()).select_from(
+            select(Rating.data_row_id).where(
+                Rating.data_row_id.in_(row_ids)
+            ).group_by(Rating.data_row_id).having(func.count(Rating.id) == new_count).subquery()
+        ).scalar_subquery()
+
+    count = len(data_row_ids)
+    _increment(db, DBSession, session.id, rating_count=count, rated_row_count=first_ratings)
+    _increment(db, Project, session.project_id, rating_count=count, rated_row_count=first_ratings)
+
+
+def session_deleted(db: Session, session: DBSession) -> None:
+    """Remove a session's counts from its project."""
+    table = DBSession.__table__
+    counts = db.execute(
+        select(*(table.c[name] for name in SESSION_COUNTERS)).where(table.c.id == session.id)
+    ).one()
+    _increment(
+        db, Project, session.project_id,
+        session_count=-1,
+        **{name: -(value or 0) for name, value in zip(SESSION_COUNTERS, counts)}
+    )
+
+
+def reconcile_counters(db: Session, project_id: Optional[str] = None) -> int:
+    """Recompute stored counters from the rows and ratings tables.
+
+    Args:
+        db: Database session; the caller commits
+        project_id: Only reconcile this project's sessions and rollups
+
+    Returns:
+        Number of sessions and projects whose counters were corrected
+    """
+    def counts_by_session(model, count):
+        query = db.query(model.session_id, count).group_by(model.session_id)
+        if project_id is not None:
+            query = query.join(DBSession, DBSession.id == model.session_id).filter(
+                DBSession.project_id == project_id
+            )
+        return dict(query.all())
+
+    row_counts = counts_by_session(DataRow, func.count(DataRow.id))
+    rating_counts = counts_by_session(Rating, func.count(Rating.id))
+    rated_row_counts = counts_by_session(Rating, func.count(distinct(Rating.data_row_id)))
+
+    # Pending sessions are counted once their ingest job completes
+    sessions = db.query(DBSession).filter(DBSession.status == "ready")
+    projects = db.query(Project)
+    if project_id is not None:
+        sessions = sessions.filter(DBSession.project_id == project_id)
+        projects = projects.filter(Project.id == project_id)
+
+    corrected = 0
+    rollups = {}
+    for session in sessions:
+        actual = {
+            "row_count": row_counts.get(session.id, 0),
+            "rating_count": rating_counts.get(session.id, 0),
+            "rated_row_count": rated_row_counts.get(session.id, 0),
+        }
+        if any(getattr(session, name) != value for name, value in actual.items()):
+            for name, value in actual.items():
+                setattr(session, name, value)
+            corrected += 1
+
+        rollup = rollups.setdefault(session.project_id, dict.fromkeys(PROJECT_COUNTERS, 0))
+        rollup["session_count"] += 1
+        for name, value in actual.items():
+            rollup[name] += value
+
+    for project in projects:
+        actual = rollups.get(project.id, dict.fromkeys(PROJECT_COUNTERS, 0))
+        if any(getattr(project, name) != value for name, value in actual.items()):
+            for name, value in actual.items():
+                setattr(project, name, value)
+            corrected += 1
+
+    db.flush()
+    return corrected
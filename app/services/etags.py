@@ -0,0 +1,61 @@
+"""
+Conditional GET support for project and session reads.
+
+Projects and sessions carry a version counter that writes bump in the same
+transaction as the change. An endpoint's ETag is a digest of the versions
+and stored counters its response is built from (plus the user, where the
+response differs per user), all of which are read with the access check
+anyway. A matching If-None-Match is answered with 304 before any of the
+response is built.
+"""
+
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+
+def bump_version(db: Session, model, key: str) -> None:
+    """Increment a project's or session's version; call before committing the change."""
+    table = model.__table__
+    db.execute(update(table).where(table.c.id == key).values(version=table.c.version + 1))
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag for a response built from the given versions and values."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def row_page_etag(request: Request, session, user_id: str, session_total: int, rated_count: int) -> str:
+    """ETag for a page of a session's rows as seen by one user.
+
+    Rows and ratings only change with the session version; the progress
+    totals are included since the tracker updates just after commit.
+    """
+    return make_etag(
+        "rows", session.id, session.version, user_id, session_total, rated_count,
+        sorted(request.query_params.multi_items())
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers the ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip() for tag in header.split(",")}
+    # Weak comparison, as If-None-Match requires
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+def not_modified(etag: str) -> Response:
+    """304 response for a matching ETag."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Send the ETag and ask clients to revalidate before reusing the response."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
@@ -1,68 +1,220 @@
 from openpyxl import load_workbook
 from fastapi import UploadFile, HTTPException
+from typing import Iterator, Optional, Tuple
+from datetime import date, datetime, time
+from decimal import Decimal
+import base64
+import bz2
+import gzip
 import json
 import io
 import csv
+import hashlib
+import lzma
+import shutil
+import tempfile
+
+from ..config import settings
+
+SUPPORTED_EXTENSIONS = (
+    '.csv', '.xlsx', '.xls', '.jsonl', '.ndjson', '.parquet', '.arrow', '.feather'
+)
+
+# Compression suffixes that may wrap any supported file, e.g. data.csv.gz
+COMPRESSION_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zst')
+
+# Formats that can be parsed from a forward-only decompressed stream
+STREAMABLE_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
 
 
 def parse_file(file: UploadFile) -> dict:
     """
-    Parse uploaded Excel or CSV file and return structured data.
+    Parse uploaded Excel, CSV, JSONL, Parquet or Arrow file and return structured data.
+
+    The header is read eagerly so column errors surface immediately; data
+    rows are produced lazily so the upload never has to fit in memory.
+    JSONL files may add columns as new keys appear, so callers should
+    re-read columns once all rows have been consumed. Any of these may be
+    compressed (.gz, .bz2, .xz, .zst); they are decompressed on the fly.
 
     Returns:
-        dict with keys: columns (list), rows (list of dicts), row_count (int)
+        dict with keys: columns (list), rows (iterator of dicts with
+        row_index, data and content_hash), string_values (True if values
+        are untyped strings, as from CSV and Excel), and record_count when
+        the file's metadata gives the number of data records (Excel,
+        Parquet, Arrow file format; may include blank records)
     """
+    check_supported_file(file.filename)
+    file = open_decompressed(file)
     filename = file.filename.lower()
 
     if filename.endswith('.csv'):
         return parse_csv_file(file)
-    elif filename.endswith(('.xlsx', '.xls')):
-        return parse_excel_file(file)
-    else:
+    elif filename.endswith(('.jsonl', '.ndjson')):
+        return parse_jsonl_file(file)
+    elif filename.endswith('.parquet'):
+        return parse_parquet_file(file)
+    elif filename.endswith(('.arrow', '.feather')):
+        return parse_arrow_file(file)
+    return parse_excel_file(file)
+
+
+def check_supported_file(filename: str) -> None:
+    """Reject filenames the parser can't handle before any work is done."""
+    inner_name, _ = split_compression(filename or "")
+    if not inner_name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                "Supported file types: " + ", ".join(SUPPORTED_EXTENSIONS)
+                + " (optionally compressed with " + ", ".join(COMPRESSION_EXTENSIONS) + ")"
+            )
+        )
+
+
+def split_compression(filename: str) -> Tuple[str, Optional[str]]:
+    """Split a compression suffix off a filename.
+
+    Returns:
+        Tuple of (inner_filename, compression_suffix or None)
+    """
+    lower = filename.lower()
+    for suffix in COMPRESSION_EXTENSIONS:
+        if lower.endswith(suffix):
+            return filename[:-len(suffix)], suffix
+    return filename, None
+
+
+def _open_zstd(fileobj):
+    """Open a zstd stream; zstandard is only needed for .zst uploads."""
+    try:
+        import zstandard
+    except ImportError:
         raise HTTPException(
             status_code=400,
-            detail="Only Excel files (.xlsx, .xls) and CSV files (.csv) are supported"
+            detail="Zstandard (.zst) uploads require zstandard to be installed"
         )
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(fileobj))
+
+
+def open_decompressed(file: UploadFile) -> UploadFile:
+    """Wrap a compressed upload so it reads as the inner file.
+
+    CSV and JSONL are decompressed as they are read. Excel, Parquet and
+    Arrow need random access, so those are inflated to a temporary file.
+    """
+    inner_name, compression = split_compression(file.filename)
+    if compression is None:
+        return file
+
+    if compression == '.gz':
+        stream = gzip.GzipFile(fileobj=file.file, mode='rb')
+    elif compression == '.bz2':
+        stream = bz2.BZ2File(file.file, mode='rb')
+    elif compression == '.xz':
+        stream = lzma.LZMAFile(file.file, mode='rb')
+    else:
+        stream = _open_zstd(file.file)
+
+    if not inner_name.lower().endswith(STREAMABLE_EXTENSIONS):
+        try:
+            spooled = tempfile.TemporaryFile()
+            shutil.copyfileobj(stream, spooled, 1024 * 1024)
+            spooled.seek(0)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to decompress file: {str(e)}")
+        stream = spooled
+
+    return UploadFile(file=stream, filename=inner_name)
 
 
 def parse_csv_file(file: UploadFile) -> dict:
-    """Parse uploaded CSV file."""
+    """Parse uploaded CSV file, decoding it incrementally."""
     try:
-        contents = file.file.read().decode('utf-8')
-        reader = csv.reader(io.StringIO(contents))
+        # Decode as we read instead of loading the whole upload into memory
+        stream = io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+        reader = csv.reader(stream)
 
         # Get headers from first row
         headers = next(reader, None)
         if not headers:
             raise HTTPException(status_code=400, detail="CSV file has no column headers")
 
-        # Clean headers
-        headers = [h.strip() for h in headers if h.strip()]
-        if not headers:
-            raise HTTPException(status_code=400, detail="CSV file has no valid column headers")
+        headers = clean_csv_headers(headers)
 
-        # Extract data rows
-        rows = []
-        for row_idx, row in enumerate(reader, start=1):
-            if any(cell.strip() for cell in row):
-                row_data = {}
-                for i, header in enumerate(headers):
-                    value = row[i].strip() if i < len(row) else ""
-                    row_data[header] = value
+    except HTTPException:
+        raise
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse CSV file: {str(e)}")
 
-                rows.append({
-                    "row_index": row_idx,
-                    "content": json.dumps(row_data)
-                })
+    return {
+        "columns": headers,
+        "rows": _iter_csv_rows(reader, headers),
+        "string_values": True
+    }
 
-        if not rows:
-            raise HTTPException(status_code=400, detail="CSV file has no data rows")
 
-        return {
-            "columns": headers,
-            "rows": rows,
-            "row_count": len(rows)
-        }
+def clean_csv_headers(headers: list) -> list:
+    """Strip CSV header names and drop blank ones."""
+    headers = [h.strip() for h in headers if h.strip()]
+    if not headers:
+        raise HTTPException(status_code=400, detail="CSV file has no valid column headers")
+    return headers
+
+
+def csv_row_data(row: list, headers: list) -> Optional[dict]:
+    """Map a CSV record onto the headers, or None for blank records."""
+    if not any(cell.strip() for cell in row):
+        return None
+
+    row_data = {}
+    for i, header in enumerate(headers):
+        value = row[i].strip() if i < len(row) else ""
+        row_data[header] = value
+    return row_data
+
+
+def row_content_hash(row_data: dict) -> str:
+    """Digest of a row's logical content.
+
+    Key order and empty values are ignored, so the same record hashes the
+    same whether or not the file it came from had extra empty columns.
+    """
+    canonical = json.dumps(
+        {key: value for key, value in row_data.items() if value not in ("", None)},
+        sort_keys=True,
+        default=_json_default
+    )
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def build_row(row_index: int, row_data: dict) -> dict:
+    """Build a parsed row with its data and content hash.
+
+    The hash is taken before any storage type conversion, so it matches
+    rows stored before typed storage existed.
+    """
+    return {
+        "row_index": row_index,
+        "data": row_data,
+        "content_hash": row_content_hash(row_data)
+    }
+
+
+def _iter_csv_rows(reader, headers: list) -> Iterator[dict]:
+    """Yield non-empty CSV data rows as they are read."""
+    try:
+        has_rows = False
+        for row_idx, row in enumerate(reader, start=1):
+            row_data = csv_row_data(row, headers)
+            if row_data is not None:
+                has_rows = True
+                yield build_row(row_idx, row_data)
+
+        if not has_rows:
+            raise HTTPException(status_code=400, detail="CSV file has no data rows")
 
     except HTTPException:
         raise
@@ -73,28 +225,47 @@ def parse_csv_file(file: UploadFile) -> dict:
 
 
 def parse_excel_file(file: UploadFile) -> dict:
-    """Parse uploaded Excel file."""
+    """Parse uploaded Excel file in read-only (streaming) mode."""
     try:
-        contents = file.file.read()
-        workbook = load_workbook(io.BytesIO(contents), data_only=True)
+        workbook = load_workbook(file.file, read_only=True, data_only=True)
         sheet = workbook.active
 
         if sheet is None:
+            workbook.close()
             raise HTTPException(status_code=400, detail="Excel file has no active sheet")
 
         # Extract headers from first row
         headers = []
-        for cell in sheet[1]:
-            if cell.value is not None:
-                headers.append(str(cell.value))
+        first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        for value in first_row:
+            if value is not None:
+                headers.append(str(value))
             else:
                 break
 
         if not headers:
+            workbook.close()
             raise HTTPException(status_code=400, detail="Excel file has no column headers")
 
-        # Extract data rows
-        rows = []
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse Excel file: {str(e)}")
+
+    # Dimensions come from the sheet metadata and may be missing
+    max_row = sheet.max_row
+    return {
+        "columns": headers,
+        "rows": _iter_excel_rows(workbook, sheet, headers),
+        "string_values": True,
+        "record_count": max_row - 1 if max_row else None
+    }
+
+
+def _iter_excel_rows(workbook, sheet, headers: list) -> Iterator[dict]:
+    """Yield non-empty worksheet data rows as they are read."""
+    try:
+        has_rows = False
         for row_idx, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=1):
             row_values = list(row[:len(headers)])
             if any(cell is not None for cell in row_values):
@@ -103,21 +274,168 @@ def parse_excel_file(file: UploadFile) -> dict:
                     value = row_values[i] if i < len(row_values) else None
                     row_data[header] = str(value) if value is not None else ""
 
-                rows.append({
-                    "row_index": row_idx,
-                    "content": json.dumps(row_data)
-                })
+                has_rows = True
+                yield build_row(row_idx, row_data)
 
-        if not rows:
+        if not has_rows:
             raise HTTPException(status_code=400, detail="Excel file has no data rows")
 
-        return {
-            "columns": headers,
-            "rows": rows,
-            "row_count": len(rows)
-        }
-
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to parse Excel file: {str(e)}")
+    finally:
+        # Read-only workbooks keep the underlying file open until closed
+        workbook.close()
+
+
+def _json_default(value):
+    """Encode values from typed formats that json can't serialize natively."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+def parse_jsonl_file(file: UploadFile) -> dict:
+    """Parse uploaded JSON Lines file, one object per line.
+
+    Values keep their JSON types, including nested objects and arrays.
+    Columns start as the keys of the first object and grow as new keys
+    appear in later lines.
+    """
+    stream = io.TextIOWrapper(file.file, encoding='utf-8')
+    columns = []
+    return {
+        "columns": columns,
+        "rows": _iter_jsonl_rows(stream, columns),
+        "string_values": False
+    }
+
+
+def _iter_jsonl_rows(stream, columns: list) -> Iterator[dict]:
+    """Yield JSONL objects as rows, extending columns with unseen keys."""
+    seen = set(columns)
+    row_idx = 0
+    try:
+        has_rows = False
+        for row_idx, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+
+            row_data = json.loads(line)
+            if not isinstance(row_data, dict):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"JSONL line {row_idx} is not a JSON object"
+                )
+
+            for key in row_data:
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+
+            has_rows = True
+            yield build_row(row_idx, row_data)
+
+        if not has_rows:
+            raise HTTPException(status_code=400, detail="JSONL file has no data rows")
+
+    except HTTPException:
+        raise
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="JSONL file must be UTF-8 encoded")
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON on line {row_idx} of JSONL file: {e.msg}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse JSONL file: {str(e)}")
+
+
+def _import_pyarrow():
+    """Import pyarrow lazily; it is only needed for columnar uploads."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(
+            status_code=400,
+            detail="Parquet and Arrow uploads require pyarrow to be installed"
+        )
+    return pyarrow
+
+
+def parse_parquet_file(file: UploadFile) -> dict:
+    """Parse uploaded Parquet file one record batch at a time."""
+    pa = _import_pyarrow()
+    try:
+        parquet_file = pa.parquet.ParquetFile(file.file)
+        columns = list(parquet_file.schema_arrow.names)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse Parquet file: {str(e)}")
+
+    if not columns:
+        raise HTTPException(status_code=400, detail="Parquet file has no columns")
+
+    batches = parquet_file.iter_batches(batch_size=settings.INGEST_BATCH_SIZE)
+    return {
+        "columns": columns,
+        "rows": _iter_record_batch_rows(batches, "Parquet"),
+        "string_values": False,
+        "record_count": parquet_file.metadata.num_rows
+    }
+
+
+def parse_arrow_file(file: UploadFile) -> dict:
+    """Parse uploaded Arrow IPC (file or stream format) or Feather v2 file."""
+    pa = _import_pyarrow()
+    try:
+        try:
+            reader = pa.ipc.open_file(file.file)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            record_count = reader.count_rows()
+        except pa.ArrowInvalid:
+            # Not the random-access file format; try the streaming format
+            file.file.seek(0)
+            reader = pa.ipc.open_stream(file.file)
+            batches = iter(reader)
+            record_count = None
+        columns = list(reader.schema.names)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse Arrow file: {str(e)}")
+
+    if not columns:
+        raise HTTPException(status_code=400, detail="Arrow file has no columns")
+
+    return {
+        "columns": columns,
+        "rows": _iter_record_batch_rows(batches, "Arrow"),
+        "string_values": False,
+        "record_count": record_count
+    }
+
+
+def _iter_record_batch_rows(batches, label: str) -> Iterator[dict]:
+    """Yield rows from Arrow record batches, keeping nested values as JSON."""
+    try:
+        has_rows = False
+        row_idx = 0
+        for batch in batches:
+            for row_data in batch.to_pylist():
+                row_idx += 1
+                if all(value is None for value in row_data.values()):
+                    continue
+
+                has_rows = True
+                yield build_row(row_idx, row_data)
+
+        if not has_rows:
+            raise HTTPException(status_code=400, detail=f"{label} file has no data rows")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse {label} file: {str(e)}")
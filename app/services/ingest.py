@@ -0,0 +1,258 @@
+"""
+Bulk ingest of parsed rows into the data_rows table.
+
+Rows are written with Core executemany batches instead of one ORM object
+per row, so large uploads don't pay for the unit of work or identity map.
+Every row is stored with a digest of its content so appends can skip rows
+the session already has by probing an index instead of rescanning content.
+"""
+
+import json
+import uuid
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import DataRow, Session as DBSession, row_key_default
+from . import counters
+from .excel_parser import row_content_hash
+from .row_codec import CONTENT_FORMAT_COLUMNAR, RowEncoder, decode_content
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Yield lists of at most batch_size items from an iterable."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def content_hash(content: str, columns: List[str]) -> str:
+    """Digest of a row's stored content (see row_content_hash)."""
+    return row_content_hash(decode_content(content, columns))
+
+
+def _insert_batch(db: Session, session_id: str, batch: List[dict]) -> None:
+    """Write one batch of parsed rows with a single executemany."""
+    values = [
+        {
+            "session_id": session_id,
+            "row_index": row["row_index"],
+            "content": row["content"],
+            "content_hash": row["content_hash"],
+        }
+        for row in batch
+    ]
+    if row_key_default is not None:
+        # UUID keys are generated client-side; integer keys by the database
+        for value in values:
+            value["id"] = row_key_default()
+    db.execute(insert(DataRow.__table__), values)
+
+
+def insert_rows(
+    db: Session,
+    session_id: str,
+    rows: Iterable[dict],
+    batch_size: Optional[int] = None,
+    on_batch: Optional[Callable[[int], None]] = None
+) -> int:
+    """Insert parsed rows for a session in chunked executemany batches.
+
+    Runs inside the caller's transaction; the caller is responsible for
+    committing (or rolling back), once all rows are written or from on_batch.
+
+    Args:
+        db: Database session
+        session_id: Session the rows belong to
+        rows: Iterable of dicts with row_index, content and content_hash keys
+        batch_size: Rows per INSERT batch (defaults to config)
+        on_batch: Called with the running total after each batch
+
+    Returns:
+        Number of rows inserted
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    inserted = 0
+
+    # Make sure the parent session row exists before the bulk inserts
+    db.flush()
+
+    for batch in iter_batches(rows, batch_size):
+        _insert_batch(db, session_id, batch)
+        inserted += len(batch)
+        if on_batch:
+            on_batch(inserted)
+
+    return inserted
+
+
+def start_session(
+    db: Session,
+    project_id: str,
+    name: str,
+    filename: str,
+    encoder: RowEncoder,
+    status: str = "ready"
+) -> DBSession:
+    """Add a new session with no rows yet, without committing.
+
+    Args:
+        db: Database session; the caller commits
+        project_id: Project the session belongs to
+        name: Session name
+        filename: Name of the uploaded file
+        encoder: Encoder the rows will be encoded with
+        status: "pending" keeps the session hidden until finish_session
+
+    Returns:
+        The new session
+    """
+    session = DBSession(
+        id=str(uuid.uuid4()),
+        name=name,
+        filename=filename,
+        columns=json.dumps(encoder.columns),
+        content_format=CONTENT_FORMAT_COLUMNAR,
+        status=status,
+        project_id=project_id
+    )
+    db.add(session)
+    return session
+
+
+def finish_session(db: Session, session: DBSession, encoder: RowEncoder, row_count: int) -> None:
+    """Store a new session's final columns and counts and mark it ready, without committing."""
+    # Columns can grow while streaming (JSONL), so store the final list
+    session.columns = json.dumps(encoder.columns)
+    session.column_types = json.dumps(encoder.get_column_types())
+    session.status = "ready"
+    counters.session_created(db, session, row_count)
+
+
+def create_session(
+    db: Session,
+    project_id: str,
+    name: str,
+    filename: str,
+    encoder: RowEncoder,
+    rows: Iterable[dict],
+    on_batch: Optional[Callable[[int], None]] = None
+) -> Tuple[DBSession, int]:
+    """Create a session and insert its rows, without committing.
+
+    Args:
+        db: Database session; the caller commits
+        project_id: Project the session belongs to
+        name: Session name
+        filename: Name of the uploaded file
+        encoder: Encoder the rows were encoded with; its columns and types are stored
+        rows: Encoded rows (see RowEncoder.encode_rows)
+        on_batch: Called with the running total after each batch
+
+    Returns:
+        Tuple of (session, row_count)
+    """
+    session = start_session(db, project_id, name, filename, encoder)
+    row_count = insert_rows(db, session.id, rows, on_batch=on_batch)
+    finish_session(db, session, encoder, row_count)
+    return session, row_count
+
+
+def discard_session(db: Session, session_id: str) -> None:
+    """Delete a pending session and the rows written for it so far, without committing."""
+    db.execute(delete(DataRow.__table__).where(DataRow.__table__.c.session_id == session_id))
+    db.execute(delete(DBSession.__table__).where(DBSession.__table__.c.id == session_id))
+
+
+def get_max_row_index(db: Session, session_id: str) -> int:
+    """Highest row_index in a session, or 0 if it has no rows."""
+    return db.query(func.max(DataRow.row_index)).filter(
+        DataRow.session_id == session_id
+    ).scalar() or 0
+
+
+def backfill_content_hashes(db: Session, session_id: str, batch_size: Optional[int] = None) -> int:
+    """Hash rows ingested before content hashing existed.
+
+    Only rows with a NULL hash are read, so this is a one-time cost per
+    legacy session.
+
+    Returns:
+        Number of rows hashed
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    columns = json.loads(db.query(DBSession.columns).filter(DBSession.id == session_id).scalar())
+    hashed = 0
+
+    while True:
+        missing = db.query(DataRow.id, DataRow.content).filter(
+            DataRow.session_id == session_id,
+            DataRow.content_hash.is_(None)
+        ).limit(batch_size).all()
+        if not missing:
+            return hashed
+
+        table = DataRow.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(
+                content_hash=bindparam("digest")
+            ),
+            [{"row_id": row_id, "digest": content_hash(content, columns)} for row_id, content in missing]
+        )
+        hashed += len(missing)
+
+
+def append_rows(
+    db: Session,
+    session_id: str,
+    rows: Iterable[dict],
+    batch_size: Optional[int] = None
+) -> Tuple[int, int]:
+    """Append parsed rows to an existing session, skipping duplicates.
+
+    New rows are numbered consecutively after the session's current
+    maximum row_index. A row
+    is skipped if a row with the same content hash is already in the session
+    or earlier in the same upload. Earlier batches are already written, so
+    one indexed lookup per batch covers both and cost tracks the size of the
+    new data only.
+
+    Returns:
+        Tuple of (rows_inserted, duplicates_skipped)
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    backfill_content_hashes(db, session_id, batch_size)
+    next_row_index = get_max_row_index(db, session_id) + 1
+
+    inserted = 0
+    skipped = 0
+
+    for batch in iter_batches(rows, batch_size):
+        batch_hashes = {row["content_hash"] for row in batch}
+        existing = {
+            digest for (digest,) in db.query(DataRow.content_hash).filter(
+                DataRow.session_id == session_id,
+                DataRow.content_hash.in_(batch_hashes)
+            )
+        }
+
+        new_rows = []
+        seen = set()
+        for row in batch:
+            digest = row["content_hash"]
+            if digest in existing or digest in seen:
+                skipped += 1
+                continue
+            seen.add(digest)
+            row["row_index"] = next_row_index
+            next_row_index += 1
+            new_rows.append(row)
+
+        if new_rows:
+            _insert_batch(db, session_id, new_rows)
+            inserted += len(new_rows)
+
+    return inserted, skipped
@@ -0,0 +1,231 @@
+"""
+Background ingest jobs for large uploads.
+
+Uploads are spooled to disk and parsed/inserted by a small worker pool, so
+the request returns a job id immediately and the client polls for progress.
+"""
+
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import IngestJob
+from .blob_store import blob_store
+from .excel_parser import parse_file
+from .ingest import discard_session, finish_session, insert_rows, start_session
+from .parallel_csv import (
+    ChunkAlignmentError, find_chunk_ranges, read_csv_headers, iter_parallel_csv_rows
+)
+from .row_codec import RowEncoder
+
+
+class IngestJobRunner:
+    """Runs ingest jobs on a thread pool and tracks live progress."""
+
+    def __init__(self, spool_dir: Optional[str] = None, max_workers: Optional[int] = None):
+        """Initialize the runner.
+
+        Args:
+            spool_dir: Directory for spooled uploads (defaults to config)
+            max_workers: Concurrent jobs (defaults to config)
+        """
+        self.spool_dir = Path(spool_dir) if spool_dir else Path(settings.get_spool_dir())
+        self.max_workers = max_workers or settings.INGEST_WORKERS
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._progress: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def new_spool_path(self, filename: str) -> str:
+        """Get a fresh spool file path that keeps the upload's extension."""
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        ext = Path(filename).suffix.lower()
+        return str(self.spool_dir / f"{uuid.uuid4()}{ext}")
+
+    async def spool_upload(self, file: UploadFile) -> str:
+        """Copy an upload to the spool directory.
+
+        Returns:
+            Path of the spooled file
+        """
+        spool_path = self.new_spool_path(file.filename)
+
+        with open(spool_path, "wb") as buffer:
+            while chunk := await file.read(1024 * 1024):  # Read in 1MB chunks
+                buffer.write(chunk)
+
+        return spool_path
+
+    def submit(self, job_id: str) -> None:
+        """Queue a job for processing."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="ingest"
+                )
+            executor = self._executor
+        executor.submit(self.run_job, job_id)
+
+    def resume_pending(self) -> int:
+        """Requeue jobs interrupted by a restart.
+
+        An interrupted job's pending session is discarded when it reruns.
+
+        Returns:
+            Number of jobs requeued
+        """
+        db = SessionLocal()
+        try:
+            job_ids = [
+                job_id for (job_id,) in db.query(IngestJob.id).filter(
+                    IngestJob.status.in_(["queued", "running"])
+                ).all()
+            ]
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def rows_processed(self, job: IngestJob) -> int:
+        """Get rows processed so far, including uncommitted progress."""
+        with self._lock:
+            live = self._progress.get(job.id)
+        return live if live is not None else (job.rows_processed or 0)
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs; running jobs resume on next startup."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_progress(self, job_id: str, rows: int) -> None:
+        with self._lock:
+            self._progress[job_id] = rows
+
+    def _use_parallel(self, job: IngestJob) -> bool:
+        """Large CSV uploads are parsed across multiple processes."""
+        return (
+            job.filename.lower().endswith(".csv")
+            and settings.INGEST_PROCESSES > 1
+            and os.path.getsize(job.spool_path) >= settings.INGEST_PARALLEL_MIN_BYTES
+        )
+
+    def _ingest(self, db: Session, job: IngestJob, parallel: bool) -> Tuple[str, int]:
+        """Create the job's session and insert its rows.
+
+        The session is committed as pending first and its rows in batches of
+        INGEST_BATCH_SIZE, so the database isn't locked for the whole job.
+        It is marked ready by the caller's final commit.
+
+        Returns:
+            Tuple of (session_id, row_count)
+        """
+        job_id = job.id
+        spooled = None
+        try:
+            if parallel:
+                data_start, ranges = find_chunk_ranges(job.spool_path, settings.INGEST_CHUNK_BYTES)
+                encoder = RowEncoder(
+                    read_csv_headers(job.spool_path, data_start), coerce_strings=True, blob_store=blob_store
+                )
+                rows = iter_parallel_csv_rows(
+                    job.spool_path, encoder, ranges, settings.INGEST_PROCESSES
+                )
+            else:
+                spooled = open(job.spool_path, "rb")
+                parsed = parse_file(UploadFile(file=spooled, filename=job.filename))
+                encoder = RowEncoder(
+                    parsed["columns"], coerce_strings=parsed["string_values"], blob_store=blob_store
+                )
+                rows = encoder.encode_rows(parsed["rows"])
+
+            session = start_session(
+                db, job.project_id, job.session_name, job.filename, encoder, status="pending"
+            )
+            session_id = session.id
+            job.session_id = session_id
+            db.commit()
+
+            def batch_written(count: int) -> None:
+                job.rows_processed = count
+                db.commit()
+                self._set_progress(job_id, count)
+
+            row_count = insert_rows(db, session_id, rows, on_batch=batch_written)
+            finish_session(db, session, encoder, row_count)
+        finally:
+            if spooled is not None:
+                spooled.close()
+
+        return session_id, row_count
+
+    def _discard(self, db: Session, job: IngestJob) -> None:
+        """Delete the pending session a failed or interrupted run left behind, and commit."""
+        if job.session_id:
+            discard_session(db, job.session_id)
+            job.session_id = None
+        job.rows_processed = 0
+        db.commit()
+        self._set_progress(job.id, 0)
+
+    def run_job(self, job_id: str) -> None:
+        """Parse a spooled upload and insert it as a new session."""
+        db = SessionLocal()
+        try:
+            job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+            if not job or job.status in ("completed", "failed"):
+                return
+
+            # A run interrupted by a restart may have committed some batches
+            self._discard(db, job)
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            db.commit()
+
+            try:
+                try:
+                    session_id, row_count = self._ingest(db, job, parallel=self._use_parallel(job))
+                except ChunkAlignmentError:
+                    # Quoting the boundary scan can't follow; redo it sequentially
+                    db.rollback()
+                    self._discard(db, job)
+                    session_id, row_count = self._ingest(db, job, parallel=False)
+
+                job.session_id = session_id
+                job.rows_processed = row_count
+                job.status = "completed"
+                job.finished_at = datetime.utcnow()
+                db.commit()
+
+            except Exception as e:
+                db.rollback()
+                job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+                self._discard(db, job)
+                job.status = "failed"
+                job.error = e.detail if isinstance(e, HTTPException) else str(e)
+                job.finished_at = datetime.utcnow()
+                db.commit()
+
+            if os.path.exists(job.spool_path):
+                os.remove(job.spool_path)
+
+        finally:
+            with self._lock:
+                self._progress.pop(job_id, None)
+            db.close()
+
+
+# Module-level instance
+ingest_jobs = IngestJobRunner()
@@ -0,0 +1,181 @@
+"""
+Multi-process CSV ingest for large spooled uploads.
+
+The file is split into byte ranges that end on record boundaries, each range
+is parsed and encoded to stored row content in a worker process, and the
+results are yielded back in file order so a single writer can assign
+row_index. Column types observed by the workers are merged into the
+caller's encoder.
+
+Record boundaries are found by tracking quote parity, which assumes RFC 4180
+quoting (quote characters only appear inside quoted fields). Workers parse
+strictly and raise ChunkAlignmentError if a range does not start and end on
+a record, so callers can fall back to the sequential parser.
+"""
+
+import csv
+import io
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
+from fastapi import HTTPException
+
+from .excel_parser import build_row, clean_csv_headers, csv_row_data
+from .blob_store import blob_store
+from .row_codec import RowEncoder
+
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class ChunkAlignmentError(Exception):
+    """A byte range did not line up with CSV record boundaries."""
+
+
+def find_chunk_ranges(path: str, chunk_bytes: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """Split a CSV file into byte ranges aligned on record boundaries.
+
+    Args:
+        path: Path of the CSV file
+        chunk_bytes: Target size of each range
+
+    Returns:
+        Tuple of (data_start, ranges) where data_start is the offset just past
+        the header record and ranges is a list of (start, end) offsets
+    """
+    boundaries = []  # Offsets just past a record-ending newline
+    next_target = 0  # First boundary is the end of the header record
+    data_start = None
+    in_quotes = False
+    offset = 0
+
+    with open(path, "rb") as f:
+        while block := f.read(SCAN_BLOCK_SIZE):
+            pos = 0
+            while True:
+                newline = block.find(b"\n", max(pos, next_target - offset))
+                if newline == -1:
+                    break
+                # Quote parity up to this newline decides if it ends a record
+                if block.count(b'"', pos, newline) % 2:
+                    in_quotes = not in_quotes
+                if not in_quotes:
+                    boundary = offset + newline + 1
+                    if data_start is None:
+                        data_start = boundary
+                    else:
+                        boundaries.append(boundary)
+                    next_target = boundary + chunk_bytes
+                pos = newline + 1
+            if block.count(b'"', pos) % 2:
+                in_quotes = not in_quotes
+            offset += len(block)
+
+    if data_start is None:
+        # Header without a trailing newline; there are no data rows
+        return offset, []
+
+    ranges = []
+    start = data_start
+    for boundary in boundaries:
+        if boundary > start:
+            ranges.append((start, boundary))
+            start = boundary
+    if offset > start:
+        ranges.append((start, offset))
+
+    return data_start, ranges
+
+
+def read_csv_headers(path: str, data_start: int) -> list:
+    """Parse the header record that ends at data_start."""
+    with open(path, "rb") as f:
+        header_bytes = f.read(data_start)
+
+    try:
+        headers = next(csv.reader(io.StringIO(header_bytes.decode("utf-8"), newline="")), None)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+
+    if not headers:
+        raise HTTPException(status_code=400, detail="CSV file has no column headers")
+    return clean_csv_headers(headers)
+
+
+def parse_chunk(path: str, start: int, end: int, headers: list) -> Tuple[int, List[dict], dict]:
+    """Parse one byte range in a worker process.
+
+    Returns:
+        Tuple of (record_count, rows, column_types) where rows are encoded
+        rows for the non-blank records, with row_index counted from 1
+        within the range, and column_types are the types observed
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    text = data.decode("utf-8")
+    encoder = RowEncoder(headers, coerce_strings=True, blob_store=blob_store)
+    rows = []
+    record_count = 0
+
+    try:
+        for record_count, row in enumerate(csv.reader(io.StringIO(text, newline=""), strict=True), start=1):
+            row_data = csv_row_data(row, headers)
+            if row_data is not None:
+                parsed = build_row(record_count, row_data)
+                parsed["content"] = encoder.encode(parsed.pop("data"))
+                rows.append(parsed)
+    except csv.Error as e:
+        raise ChunkAlignmentError(f"Bytes {start}-{end}: {e}")
+
+    return record_count, rows, encoder.column_types
+
+
+def iter_parallel_csv_rows(
+    path: str,
+    encoder: RowEncoder,
+    ranges: List[Tuple[int, int]],
+    processes: int
+) -> Iterator[dict]:
+    """Parse ranges in a process pool and yield encoded rows in file order.
+
+    At most two ranges per process are in flight, so memory stays bounded
+    when the database writer is slower than the parsers.
+    """
+    has_rows = False
+    record_offset = 0
+    pending = deque()
+    remaining = iter(ranges)
+
+    try:
+        # Spawn rather than fork: the server process runs other threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            def submit_next() -> bool:
+                chunk = next(remaining, None)
+                if chunk is None:
+                    return False
+                pending.append(executor.submit(parse_chunk, path, chunk[0], chunk[1], encoder.columns))
+                return True
+
+            for _ in range(processes * 2):
+                if not submit_next():
+                    break
+
+            while pending:
+                record_count, rows, column_types = pending.popleft().result()
+                submit_next()
+                encoder.merge_column_types(column_types)
+
+                for row in rows:
+                    has_rows = True
+                    row["row_index"] += record_offset
+                    yield row
+                record_offset += record_count
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+
+    if not has_rows:
+        raise HTTPException(status_code=400, detail="CSV file has no data rows")
@@ -0,0 +1,137 @@
+"""
+Cheap previews of dataset uploads.
+
+A preview reads the header and the first few rows through the same streaming
+parsers used for ingest, then stops. The total row count comes from file
+metadata when the format records it, and is otherwise estimated from the
+file size and the average size of the sampled rows.
+
+Clients can send only the head of a large CSV or JSONL file. Excel, Parquet
+and Arrow files keep their index at the end, so they must be sent whole.
+"""
+
+import io
+import json
+import os
+from collections import Counter
+from itertools import islice
+from typing import List, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from .excel_parser import parse_file, split_compression
+from .media_service import detect_content_type
+
+
+# Formats that can be parsed from just the head of the file
+HEAD_PREVIEW_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
+
+
+def get_upload_size(file: UploadFile) -> Optional[int]:
+    """Size in bytes of an uploaded file, without reading it."""
+    if file.size is not None:
+        return file.size
+    try:
+        return os.fstat(file.file.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def estimate_row_bytes(filename: str, row_data: dict) -> Optional[int]:
+    """Approximate bytes a row takes in the source file.
+
+    Only text formats are estimated; binary formats report their count in
+    metadata instead.
+    """
+    lower = filename.lower()
+    if lower.endswith('.csv'):
+        values = [str(value) for value in row_data.values()]
+        return sum(len(value.encode('utf-8')) for value in values) + len(values)
+    if lower.endswith(('.jsonl', '.ndjson')):
+        return len(json.dumps(row_data).encode('utf-8')) + 1
+    return None
+
+
+def summarize_column(values: List[str]) -> dict:
+    """Detect the content types of a column's sampled values.
+
+    Returns:
+        dict with the most common content type and counts per type
+    """
+    counts = Counter(
+        detect_content_type(value)[0]
+        for value in values
+        if isinstance(value, str) and value.strip()
+    )
+    return {
+        "content_type": counts.most_common(1)[0][0] if counts else "text",
+        "content_type_counts": dict(counts)
+    }
+
+
+def preview_file(file: UploadFile, max_rows: int, file_size: Optional[int] = None) -> dict:
+    """Parse the header and first rows of an upload.
+
+    Args:
+        file: The uploaded file, or just the head of it
+        max_rows: Number of rows to sample
+        file_size: Size of the full file, when only its head was uploaded
+            (CSV and JSONL only; see HEAD_PREVIEW_EXTENSIONS)
+
+    Returns:
+        dict with keys: columns, rows (sampled row data), estimated_row_count
+        and column_types (per-column content type summary)
+    """
+    received_size = get_upload_size(file)
+    total_size = file_size or received_size
+    inner_filename, compression = split_compression(file.filename)
+    truncated = file_size is not None and received_size is not None and file_size > received_size
+
+    if truncated and not inner_filename.lower().endswith(HEAD_PREVIEW_EXTENSIONS):
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV and JSONL files can be previewed from their head; send the whole file"
+        )
+
+    if truncated and compression is None:
+        # Cut the head slice back to the last full line so a multi-byte
+        # character split at the end doesn't fail UTF-8 decoding
+        head = file.file.read()
+        file = UploadFile(file=io.BytesIO(head[:head.rfind(b"\n") + 1] or head), filename=file.filename)
+
+    parsed = parse_file(file)
+    rows_iter = parsed["rows"]
+    try:
+        sampled = [row["data"] for row in islice(rows_iter, max_rows + 1)]
+    finally:
+        rows_iter.close()
+
+    exhausted = len(sampled) <= max_rows
+    if exhausted and truncated and sampled:
+        # The head slice ran out mid-file, so the last record may be cut off
+        sampled.pop()
+    rows = sampled[:max_rows]
+
+    if exhausted and not truncated:
+        estimated_row_count = len(rows)
+    elif parsed.get("record_count") is not None:
+        estimated_row_count = parsed["record_count"]
+    else:
+        estimated_row_count = None
+        row_sizes = [estimate_row_bytes(file.filename, row) for row in rows]
+        if rows and total_size and compression is None and None not in row_sizes:
+            average = sum(row_sizes) / len(row_sizes)
+            estimated_row_count = max(len(rows), round(total_size / average))
+
+    columns = parsed["columns"]
+    column_types = {
+        column: summarize_column([row.get(column) for row in rows])
+        for column in columns
+    }
+
+    return {
+        "columns": columns,
+        "rows": rows,
+        "estimated_row_count": estimated_row_count,
+        "column_types": column_types
+    }
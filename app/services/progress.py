@@ -0,0 +1,261 @@
+"""
+Per-rater completion bitmaps.
+
+Each (session, rater) pair has a bitmap with bit n set once the rater has
+rated the row with row_index n, plus a running count of set bits. Each
+session also has a bitmap of the row_index values that exist, since
+row_index can have gaps (e.g. skipped blank lines). Progress is then a
+counter read, and the next unrated row is found by scanning for the first
+row bit that is not also a rated bit.
+
+Bitmaps live in memory and are loaded per session on first use. Loading
+starts from the snapshots in rater_progress, checks each snapshot's count
+against the ratings table, and rebuilds any that disagree from ratings.
+Ratings are only ever added for a (row, rater) pair, so matching counts
+mean matching sets. Snapshots are written back periodically and on
+shutdown. State is per process, which matches how the app is served
+(a single process alongside its ingest workers).
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import DataRow, Rating, RaterProgress
+
+# Bytes compared per step when scanning for unrated rows
+SCAN_BLOCK_BYTES = 4096
+
+
+class CompletionBitmap:
+    """A set of row indexes stored as a bitmap with a running count."""
+
+    __slots__ = ("bits", "count")
+
+    def __init__(self, bits: bytes = b"", count: Optional[int] = None):
+        self.bits = bytearray(bits)
+        self.count = count if count is not None else int.from_bytes(self.bits, "little").bit_count()
+
+    @classmethod
+    def from_indexes(cls, indexes: Iterable[int]) -> "CompletionBitmap":
+        """Build a bitmap with the given indexes set."""
+        bitmap = cls()
+        for index in indexes:
+            bitmap.add(index)
+        return bitmap
+
+    def add(self, index: int) -> bool:
+        """Set an index; returns True if it wasn't already set."""
+        byte, mask = index >> 3, 1 << (index & 7)
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        if self.bits[byte] & mask:
+            return False
+        self.bits[byte] |= mask
+        self.count += 1
+        return True
+
+    def __contains__(self, index: int) -> bool:
+        byte = index >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (index & 7)))
+
+
+def iter_unset(rows: CompletionBitmap, rated: CompletionBitmap, start: int) -> Iterator[int]:
+    """Yield indexes >= start that are set in rows but not in rated."""
+    byte = start >> 3
+    end_byte = len(rows.bits)
+    while byte < end_byte:
+        block_end = min(byte + SCAN_BLOCK_BYTES, end_byte)
+        candidates = (
+            int.from_bytes(rows.bits[byte:block_end], "little")
+            & ~int.from_bytes(rated.bits[byte:block_end], "little")
+        )
+        base = byte * 8
+        if base < start:
+            candidates &= ~((1 << (start - base)) - 1)
+        while candidates:
+            lowest = candidates & -candidates
+            yield base + lowest.bit_length() - 1
+            candidates ^= lowest
+        byte = block_end
+
+
+class ProgressTracker:
+    """Keeps completion bitmaps for every rater of every loaded session."""
+
+    def __init__(self, flush_seconds: Optional[int] = None):
+        """Initialize the tracker.
+
+        Args:
+            flush_seconds: Minimum seconds between snapshot writes (defaults to config)
+        """
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.PROGRESS_FLUSH_SECONDS
+        self._rated: Dict[str, Dict[str, CompletionBitmap]] = {}
+        self._rows: Dict[str, CompletionBitmap] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+    def _load_session(self, db: Session, session_id: str) -> Dict[str, CompletionBitmap]:
+        """Get a session's rater bitmaps, loading them on first use."""
+        with self._lock:
+            raters = self._rated.get(session_id)
+            if raters is not None:
+                return raters
+
+            raters = {
+                snapshot.rater_id: CompletionBitmap(snapshot.bitmap, snapshot.rated_count)
+                for snapshot in db.query(RaterProgress).filter(RaterProgress.session_id == session_id)
+            }
+            counts = dict(
+                db.query(Rating.rater_id, func.count(Rating.id)).filter(
+                    Rating.session_id == session_id
+                ).group_by(Rating.rater_id).all()
+            )
+
+            stale = [
+                rater_id for rater_id, count in counts.items()
+                if rater_id not in raters or raters[rater_id].count != count
+            ]
+            for rater_id in raters.keys() - counts.keys():
+                raters[rater_id] = CompletionBitmap()
+            if stale:
+                rebuilt = {rater_id: CompletionBitmap() for rater_id in stale}
+                results = db.query(Rating.rater_id, DataRow.row_index).join(
+                    DataRow, DataRow.id == Rating.data_row_id
+                ).filter(
+                    Rating.session_id == session_id,
+                    Rating.rater_id.in_(stale)
+                )
+                for rater_id, row_index in results.yield_per(10000):
+                    rebuilt[rater_id].add(row_index)
+                raters.update(rebuilt)
+                self._dirty.update((session_id, rater_id) for rater_id in stale)
+
+            self._rated[session_id] = raters
+            return raters
+
+    def _load_rows(self, db: Session, session_id: str) -> CompletionBitmap:
+        """Get the bitmap of a session's existing row indexes."""
+        with self._lock:
+            rows = self._rows.get(session_id)
+            if rows is None:
+                results = db.query(DataRow.row_index).filter(DataRow.session_id == session_id)
+                rows = CompletionBitmap.from_indexes(index for (index,) in results.yield_per(10000))
+                self._rows[session_id] = rows
+            return rows
+
+    def mark_rated(self, db: Session, session_id: str, rater_id: str, row_index: int) -> None:
+        """Record a committed rating; call after the transaction commits."""
+        with self._lock:
+            raters = self._load_session(db, session_id)
+            bitmap = raters.get(rater_id)
+            if bitmap is None:
+                bitmap = raters[rater_id] = CompletionBitmap()
+            if bitmap.add(row_index):
+                self._dirty.add((session_id, rater_id))
+            flush_due = time.monotonic() - self._last_flush >= self.flush_seconds
+
+        if flush_due:
+            try:
+                self.flush()
+            except Exception:
+                # The rating itself is committed; snapshots are retried on the next flush
+                pass
+
+    def rated_count(self, db: Session, session_id: str, rater_id: str) -> int:
+        """Number of rows in a session the rater has rated."""
+        with self._lock:
+            bitmap = self._load_session(db, session_id).get(rater_id)
+            return bitmap.count if bitmap else 0
+
+    def session_rating_count(self, db: Session, session_id: str) -> int:
+        """Number of ratings in a session across all raters."""
+        with self._lock:
+            return sum(bitmap.count for bitmap in self._load_session(db, session_id).values())
+
+    def row_count(self, db: Session, session_id: str) -> int:
+        """Number of rows in a session."""
+        return self._load_rows(db, session_id).count
+
+    def next_unrated(
+        self,
+        db: Session,
+        session_id: str,
+        rater_id: str,
+        after: int,
+        limit: int
+    ) -> List[int]:
+        """Row indexes after a given row_index that the rater hasn't rated."""
+        with self._lock:
+            rows = self._load_rows(db, session_id)
+            rated = self._load_session(db, session_id).get(rater_id) or CompletionBitmap()
+            found = []
+            for row_index in iter_unset(rows, rated, after + 1):
+                found.append(row_index)
+                if len(found) >= limit:
+                    break
+            return found
+
+    def invalidate_rows(self, session_id: str) -> None:
+        """Forget a session's row bitmap after rows were added."""
+        with self._lock:
+            self._rows.pop(session_id, None)
+
+    def discard_session(self, session_id: str) -> None:
+        """Drop all state for a session; it is reloaded from the database if still needed."""
+        with self._lock:
+            self._rows.pop(session_id, None)
+            self._rated.pop(session_id, None)
+            self._dirty = {key for key in self._dirty if key[0] != session_id}
+
+    def flush(self) -> int:
+        """Write snapshots of changed bitmaps to the database.
+
+        Returns:
+            Number of snapshots written
+        """
+        with self._lock:
+            dirty = [
+                (session_id, rater_id, bytes(bitmap.bits), bitmap.count)
+                for session_id, rater_id in self._dirty
+                if (bitmap := self._rated.get(session_id, {}).get(rater_id)) is not None
+            ]
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+
+        if not dirty:
+            return 0
+
+        db = SessionLocal()
+        try:
+            for session_id, rater_id, bits, count in dirty:
+                snapshot = db.query(RaterProgress).filter(
+                    RaterProgress.session_id == session_id,
+                    RaterProgress.rater_id == rater_id
+                ).first()
+                if snapshot is None:
+                    snapshot = RaterProgress(session_id=session_id, rater_id=rater_id)
+                    db.add(snapshot)
+                snapshot.bitmap = bits
+                snapshot.rated_count = count
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Keep them dirty so the next flush retries
+            with self._lock:
+                self._dirty.update((session_id, rater_id) for session_id, rater_id, _, _ in dirty)
+            raise
+        finally:
+            db.close()
+
+        return len(dirty)
+
+
+# Module-level instance
+progress = ProgressTracker()
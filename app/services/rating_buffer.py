@@ -0,0 +1,234 @@
+"""
+Write-behind buffer for rating submissions.
+
+With RATING_WRITE_BUFFER enabled, POST /ratings queues its write instead of
+committing it. A writer thread collects queued ratings for RATING_FLUSH_MS
+(or until RATING_FLUSH_MAX_ITEMS are waiting) and writes them with one
+upsert and one commit, so a burst of submissions costs one transaction and
+one fsync instead of one each. Writes for the same (row, rater) that are
+still queued are coalesced, and the latest one wins.
+
+RATING_WRITE_ACK decides when a request is answered. With "commit" it waits
+for the group commit that contains its rating, so an acknowledged rating is
+durable. With "queued" it is answered as soon as the write is queued, which
+is faster but loses ratings still queued if the process dies.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Session as DBSession
+from . import counters
+from .etags import bump_version
+from .progress import progress
+from .rating_writes import upsert_ratings
+
+ACK_COMMIT = "commit"
+ACK_QUEUED = "queued"
+
+
+class _PendingRating:
+    """A queued rating write and the requests waiting on it."""
+
+    __slots__ = ("values", "row_index", "futures")
+
+    def __init__(self, values: dict, row_index: int):
+        self.values = values
+        self.row_index = row_index
+        self.futures: List[Future] = []
+
+    @property
+    def key(self) -> Tuple[object, str]:
+        return self.values["data_row_id"], self.values["rater_id"]
+
+
+class RatingWriteBuffer:
+    """Queues rating upserts and writes them in group commits."""
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        flush_ms: Optional[int] = None,
+        max_items: Optional[int] = None,
+        ack: Optional[str] = None
+    ):
+        """Initialize the buffer.
+
+        Args:
+            enabled: Queue rating writes instead of committing them per request (defaults to config)
+            flush_ms: Milliseconds to collect writes before a group commit (defaults to config)
+            max_items: Queued writes that trigger a group commit early (defaults to config)
+            ack: "commit" or "queued", when submit's caller is answered (defaults to config)
+        """
+        self.enabled = enabled if enabled is not None else settings.RATING_WRITE_BUFFER
+        self.flush_seconds = (flush_ms if flush_ms is not None else settings.RATING_FLUSH_MS) / 1000
+        self.max_items = max_items or settings.RATING_FLUSH_MAX_ITEMS
+        self.ack = ack or settings.RATING_WRITE_ACK
+        if self.ack not in (ACK_COMMIT, ACK_QUEUED):
+            raise ValueError(f"RATING_WRITE_ACK must be '{ACK_COMMIT}' or '{ACK_QUEUED}', not '{self.ack}'")
+
+        self._pending: Dict[Tuple[object, str], _PendingRating] = {}
+        self._condition = threading.Condition()
+        # Held while taking and writing a group, so groups are written in order
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.commits = 0
+        self.written = 0
+        self.failed = 0
+
+    def submit(self, values: dict, row_index: int) -> Optional[Future]:
+        """Queue a rating write.
+
+        Args:
+            values: Rating column values for upsert_ratings
+            row_index: Index of the rated row, for the progress bitmap
+
+        Returns:
+            With ack "commit", a future resolved with the written rating's
+            columns (see upsert_ratings) once it is committed; otherwise None
+        """
+        with self._condition:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="rating-writer", daemon=True)
+                self._thread.start()
+
+            entry = _PendingRating(values, row_index)
+            queued = self._pending.get(entry.key)
+            if queued is not None:
+                # Not written yet, so only the latest values need to be
+                queued.values = values
+                entry = queued
+                self.coalesced += 1
+            else:
+                self._pending[entry.key] = entry
+            self.submitted += 1
+
+            future = None
+            if self.ack == ACK_COMMIT:
+                future = Future()
+                entry.futures.append(future)
+            # Wakes the writer if idle; it checks whether the group is full
+            self._condition.notify()
+        return future
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread."""
+        with self._write_lock:
+            with self._condition:
+                entries, self._pending = list(self._pending.values()), {}
+            self._write_group(entries)
+
+    def shutdown(self) -> None:
+        """Stop the writer thread after writing what is queued."""
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        """Write and group commit counters."""
+        with self._condition:
+            return {
+                "enabled": self.enabled,
+                "ack": self.ack,
+                "pending": len(self._pending),
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "commits": self.commits,
+                "written": self.written,
+                "failed": self.failed,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                # Let more writes join the group until it is due or full
+                deadline = time.monotonic() + self.flush_seconds
+                while len(self._pending) < self.max_items and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            self.flush()
+
+    def _write_group(self, entries: List[_PendingRating]) -> None:
+        for start in range(0, len(entries), self.max_items):
+            group = entries[start:start + self.max_items]
+            try:
+                self._write(group)
+            except Exception as e:
+                if len(group) == 1:
+                    self._fail(group[0], e)
+                    continue
+                # Retry one by one so a single bad rating doesn't fail the rest
+                for entry in group:
+                    try:
+                        self._write([entry])
+                    except Exception as entry_error:
+                        self._fail(entry, entry_error)
+
+    def _write(self, entries: List[_PendingRating]) -> None:
+        """Upsert ratings, adjust counters and versions, and commit once."""
+        db = SessionLocal()
+        try:
+            written = upsert_ratings(db, [entry.values for entry in entries])
+            created = [entry for entry in entries if written[entry.key].revision == 1]
+
+            new_rows_by_session = defaultdict(list)
+            for entry in created:
+                new_rows_by_session[entry.values["session_id"]].append(entry.values["data_row_id"])
+            session_ids = {entry.values["session_id"] for entry in entries}
+            sessions = db.query(DBSession).filter(DBSession.id.in_(session_ids))
+            for session in sessions:
+                counters.ratings_added(db, session, new_rows_by_session.get(session.id, []))
+                bump_version(db, DBSession, session.id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            db.close()
+            raise
+
+        # Outside the try above: the ratings are committed, so a failure here
+        # must not reach _write_group and be retried or failed
+        try:
+            for entry in created:
+                progress.mark_rated(db, entry.values["session_id"], entry.values["rater_id"], entry.row_index)
+        except Exception:
+            # Dropped bitmaps are rebuilt from the ratings when next loaded
+            for session_id in {entry.values["session_id"] for entry in created}:
+                progress.discard_session(session_id)
+        finally:
+            db.close()
+
+        with self._condition:
+            self.commits += 1
+            self.written += len(entries)
+        for entry in entries:
+            for future in entry.futures:
+                future.set_result(written[entry.key])
+
+    def _fail(self, entry: _PendingRating, error: Exception) -> None:
+        with self._condition:
+            self.failed += 1
+        for future in entry.futures:
+            future.set_exception(error)
+
+
+# Module-level instance
+rating_buffer = RatingWriteBuffer()
@@ -0,0 +1,71 @@
+"""
+Atomic rating upserts.
+
+A rater has at most one rating per row (unique_rating_per_rater). Ratings
+are written with a single INSERT ... ON CONFLICT (data_row_id, rater_id)
+DO UPDATE ... RETURNING statement, so creating and updating a rating is one
+round trip, and concurrent submissions for the same row (two tabs, a
+retried request) are resolved by the database rather than failing on the
+constraint. Every update bumps the rating's revision, which starts at 1, so
+the returned revision tells the caller whether the rating was created.
+"""
+
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..models import Rating
+
+RETURNED_COLUMNS = (
+    "id", "data_row_id", "rater_id", "rating_value", "response", "comment", "rated_at", "revision"
+)
+
+
+def _dialect_insert(dialect_name: str):
+    """The insert construct with ON CONFLICT support for a dialect."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Rating upserts are not supported on {dialect_name}")
+    return insert
+
+
+def upsert_ratings(db: Session, values: List[dict]) -> Dict[Tuple[object, str], Row]:
+    """Create or update ratings with one statement.
+
+    Updates replace the rating value, response and comment, and the time
+    spent if one is given; rated_at keeps the time of the first rating.
+
+    Args:
+        db: Database session; the caller commits
+        values: Rating column values (data_row_id, session_id, rater_id,
+            rating_value, response, comment, time_spent_ms), at most one per
+            (data_row_id, rater_id) pair
+
+    Returns:
+        Mapping of (data_row_id, rater_id) to the written rating's
+        RETURNED_COLUMNS; revision is 1 if the rating was created
+    """
+    if not values:
+        return {}
+
+    table = Rating.__table__
+    insert = _dialect_insert(db.get_bind().dialect.name)
+    statement = insert(table).values(values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.data_row_id, table.c.rater_id],
+        set_={
+            "rating_value": statement.excluded.rating_value,
+            "response": statement.excluded.response,
+            "comment": statement.excluded.comment,
+            "time_spent_ms": func.coalesce(
+                func.nullif(statement.excluded.time_spent_ms, 0), table.c.time_spent_ms
+            ),
+            "revision": table.c.revision + 1,
+        }
+    ).returning(*(table.c[name] for name in RETURNED_COLUMNS))
+    return {(row.data_row_id, row.rater_id): row for row in db.execute(statement)}
@@ -0,0 +1,144 @@
+"""
+Chunk storage for resumable uploads.
+
+Each upload gets a directory of numbered chunk files under the spool
+directory. A chunk is only kept once its checksum and size match, so the set of
+chunk files on disk is the record of what has been received.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from ..config import settings
+
+
+class ChunkRejectedError(Exception):
+    """Chunk data did not match its checksum or expected size."""
+
+
+class ChunkedFileReader(io.RawIOBase):
+    """Read a sequence of chunk files as one contiguous stream."""
+
+    def __init__(self, paths: List[Path]):
+        self._paths = list(paths)
+        self._current = None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return 0
+                self._current = open(self._paths.pop(0), "rb")
+            n = self._current.readinto(buffer)
+            if n:
+                return n
+            self._current.close()
+            self._current = None
+
+    def close(self) -> None:
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+        super().close()
+
+
+class ResumableUploadStore:
+    """Stores and assembles the chunks of resumable uploads."""
+
+    def __init__(self, base_path: Optional[str] = None):
+        """Initialize the store.
+
+        Args:
+            base_path: Directory for chunk files (defaults to the spool directory)
+        """
+        self.base_path = Path(base_path) if base_path else Path(settings.get_spool_dir()) / "resumable"
+
+    def get_upload_path(self, upload_id: str) -> Path:
+        """Get the directory holding an upload's chunks."""
+        return self.base_path / upload_id
+
+    def get_chunk_path(self, upload_id: str, chunk_number: int) -> Path:
+        """Get the path of a single chunk file."""
+        return self.get_upload_path(upload_id) / f"{chunk_number:08d}.part"
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        chunk_number: int,
+        stream: AsyncIterator[bytes],
+        sha256: str,
+        expected_size: int
+    ) -> None:
+        """Write a chunk from a byte stream, keeping it only if it validates.
+
+        A rejected chunk never replaces a previously accepted copy.
+        """
+        upload_path = self.get_upload_path(upload_id)
+        upload_path.mkdir(parents=True, exist_ok=True)
+        chunk_path = self.get_chunk_path(upload_id, chunk_number)
+        # A temp file per request, so a retry racing the original can't mix their bytes
+        fd, temp_name = tempfile.mkstemp(dir=upload_path, prefix=f"{chunk_number:08d}.", suffix=".tmp")
+        temp_path = Path(temp_name)
+
+        digest = hashlib.sha256()
+        size_bytes = 0
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                async for data in stream:
+                    size_bytes += len(data)
+                    if size_bytes > expected_size:
+                        raise ChunkRejectedError(
+                            f"Chunk {chunk_number} must be {expected_size} bytes, got more"
+                        )
+                    buffer.write(data)
+                    digest.update(data)
+
+            if size_bytes != expected_size:
+                raise ChunkRejectedError(
+                    f"Chunk {chunk_number} must be {expected_size} bytes, got {size_bytes}"
+                )
+            if digest.hexdigest() != sha256.lower():
+                raise ChunkRejectedError("Chunk checksum mismatch")
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        # Atomic replace so a retried chunk never leaves a partial file behind
+        os.replace(temp_path, chunk_path)
+
+    def received_chunks(self, upload_id: str) -> Dict[int, int]:
+        """Get received chunks as a mapping of chunk number to size."""
+        upload_path = self.get_upload_path(upload_id)
+        if not upload_path.exists():
+            return {}
+
+        return {
+            int(path.stem): path.stat().st_size
+            for path in upload_path.glob("*.part")
+        }
+
+    def open_reader(self, upload_id: str, chunk_count: int) -> io.BufferedReader:
+        """Open all chunks of an upload as one readable stream."""
+        paths = [self.get_chunk_path(upload_id, n) for n in range(chunk_count)]
+        return io.BufferedReader(ChunkedFileReader(paths), buffer_size=1024 * 1024)
+
+    def assemble(self, upload_id: str, chunk_count: int, dest_path: str) -> None:
+        """Concatenate all chunks of an upload into a single file."""
+        with self.open_reader(upload_id, chunk_count) as reader, open(dest_path, "wb") as dest:
+            shutil.copyfileobj(reader, dest, 1024 * 1024)
+
+    def discard(self, upload_id: str) -> None:
+        """Delete all chunk files of an upload."""
+        shutil.rmtree(self.get_upload_path(upload_id), ignore_errors=True)
+
+
+# Module-level instance
+resumable_uploads = ResumableUploadStore()
@@ -0,0 +1,150 @@
+"""
+In-process LRU cache of rendered row content.
+
+Row content never changes after ingest, so the JSON object bytes rendered
+for a row can be reused across requests and raters. Entries are keyed by
+(session_id, row_index), plus the column projection for rows rendered with
+only some of their columns, and evicted least recently used first once the
+cache holds more than its byte budget. A session's entries are dropped
+when it is deleted or appended to.
+
+Dropping a session also bumps its generation. A request reads the
+generation before it loads the session, and put_many ignores rows it
+rendered under an older one, so a page rendered from the session as it
+was before an append can't be cached after the append invalidated it.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from ..config import settings
+
+# Columns a row was rendered with, or None for all of them
+Projection = Optional[Tuple[str, ...]]
+
+# Approximate per-entry cost of the key tuple, dict slot and bytes header
+ENTRY_OVERHEAD_BYTES = 160
+
+
+class RowContentCache:
+    """Size-bounded LRU of rendered row content bytes."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget in bytes; 0 disables caching (defaults to config)
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else settings.ROW_CACHE_BYTES
+        self._entries: "OrderedDict[Tuple[str, int, Projection], bytes]" = OrderedDict()
+        self._sessions: Dict[str, Set[Tuple[int, Projection]]] = {}
+        # Kept after invalidation so a stale write can never match again
+        self._generations: Dict[str, int] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def generation(self, session_id: str) -> int:
+        """Current generation of a session's entries; read it before loading the session."""
+        with self._lock:
+            return self._generations.get(session_id, 0)
+
+    def get_many(
+        self,
+        session_id: str,
+        row_indexes: Iterable[int],
+        projection: Projection = None
+    ) -> Dict[int, bytes]:
+        """Look up rows, marking hits as recently used.
+
+        Args:
+            session_id: Session the rows belong to
+            row_indexes: Rows to look up
+            projection: Columns the content was rendered with, or None for all
+
+        Returns:
+            Mapping of row_index to content for the rows that were cached
+        """
+        found = {}
+        with self._lock:
+            for row_index in row_indexes:
+                key = (session_id, row_index, projection)
+                content = self._entries.get(key)
+                if content is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                found[row_index] = content
+                self.hits += 1
+        return found
+
+    def put_many(
+        self,
+        session_id: str,
+        contents: Dict[int, bytes],
+        projection: Projection = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """Add rendered rows, evicting the least recently used over budget.
+
+        Args:
+            session_id: Session the rows belong to
+            contents: Mapping of row_index to rendered content
+            projection: Columns the content was rendered with, or None for all
+            generation: Session generation read before the rows were rendered;
+                the rows are dropped if the session was invalidated since
+        """
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(session_id, 0):
+                return
+            session_keys = self._sessions.setdefault(session_id, set())
+            for row_index, content in contents.items():
+                key = (session_id, row_index, projection)
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= len(previous) + ENTRY_OVERHEAD_BYTES
+                self._entries[key] = content
+                session_keys.add((row_index, projection))
+                self._bytes += len(content) + ENTRY_OVERHEAD_BYTES
+
+            while self._bytes > self.max_bytes and self._entries:
+                (evicted_session, row_index, evicted_projection), content = self._entries.popitem(last=False)
+                self._bytes -= len(content) + ENTRY_OVERHEAD_BYTES
+                self.evictions += 1
+                evicted = self._sessions.get(evicted_session)
+                if evicted is not None:
+                    evicted.discard((row_index, evicted_projection))
+                    if not evicted:
+                        del self._sessions[evicted_session]
+
+    def invalidate_session(self, session_id: str) -> None:
+        """Drop every cached row of a session and start a new generation."""
+        with self._lock:
+            self._generations[session_id] = self._generations.get(session_id, 0) + 1
+            for row_index, projection in self._sessions.pop(session_id, ()):
+                content = self._entries.pop((session_id, row_index, projection), None)
+                if content is not None:
+                    self._bytes -= len(content) + ENTRY_OVERHEAD_BYTES
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Module-level instance
+row_cache = RowContentCache()
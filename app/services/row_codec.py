@@ -0,0 +1,198 @@
+"""
+Storage encoding of data row content.
+
+Sessions created before typed storage keep each row as a JSON object
+("object" format). New sessions store each row as a JSON array of values
+positioned against Session.columns ("columnar" format), so column names are
+not repeated per row. A per-session column type schema is inferred as rows
+are encoded. Values from CSV and Excel files are stored as the strings they
+were read as, with their column typed int, float or bool only if every
+value in it converts without loss; reads convert them to the column's type
+(see decode_content), so a column never mixes numbers and strings. Given a
+blob store, the encoder also moves oversized string cells out of the row
+(see blob_store).
+"""
+
+import json
+import re
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .excel_parser import _json_default
+
+CONTENT_FORMAT_OBJECT = "object"
+CONTENT_FORMAT_COLUMNAR = "columnar"
+
+_INT_PATTERN = re.compile(r"0|-?[1-9][0-9]{0,17}")
+_FLOAT_PATTERN = re.compile(r"-?(0|[1-9][0-9]*)\.[0-9]+")
+_BOOL_VALUES = {"true": True, "false": False}
+
+# Column types whose string cells are converted when read
+CONVERTED_TYPES = ("int", "float", "bool")
+
+
+def string_type(value: str) -> Optional[str]:
+    """Schema type a string cell could be stored as without loss, or None if empty."""
+    if not value:
+        return None
+    if _INT_PATTERN.fullmatch(value):
+        return "int"
+    # Only floats that print back exactly, e.g. not "1.50"
+    if _FLOAT_PATTERN.fullmatch(value) and repr(float(value)) == value:
+        return "float"
+    if value in _BOOL_VALUES:
+        return "bool"
+    return value_type(value)
+
+
+def coerce_value(value, column_type: Optional[str]):
+    """Convert a string cell to its column's type (see string_type)."""
+    if not isinstance(value, str) or not value or column_type not in CONVERTED_TYPES:
+        return value
+    if column_type == "bool":
+        return _BOOL_VALUES[value]
+    if column_type == "float" and not _INT_PATTERN.fullmatch(value):
+        return float(value)
+    return int(value)
+
+
+def value_type(value) -> Optional[str]:
+    """Schema type of a single value, or None for empty values."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, (dict, list)):
+        return "json"
+    if isinstance(value, str) and value.startswith("media://"):
+        return "media_ref"
+    return "text"
+
+
+def merge_types(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    """Widen a column type to also cover a newly observed type."""
+    if current is None or current == new:
+        return new
+    if new is None:
+        return current
+    if {current, new} == {"int", "float"}:
+        return "float"
+    return "text"
+
+
+class RowEncoder:
+    """Encodes parsed rows for storage and infers column types."""
+
+    def __init__(
+        self,
+        columns: List[str],
+        column_types: Optional[Dict[str, Optional[str]]] = None,
+        content_format: str = CONTENT_FORMAT_COLUMNAR,
+        coerce_strings: bool = False,
+        blob_store=None
+    ):
+        """Initialize the encoder.
+
+        Args:
+            columns: Session column list; the encoder appends unseen keys to its own copy
+            column_types: Types already known for the session's columns
+            content_format: Storage format of the session
+            coerce_strings: Type string values by what they can be read as (see string_type)
+            blob_store: BlobStore to move oversized cells into, or None to keep them inline
+        """
+        self.columns = list(columns)
+        self.column_types = dict(column_types or {})
+        self.content_format = content_format
+        self.coerce_strings = coerce_strings
+        self.blob_store = blob_store
+        self._positions = {column: i for i, column in enumerate(columns)}
+
+    def encode(self, row_data: dict) -> str:
+        """Encode one row's data as stored content JSON."""
+        column_types = self.column_types
+        positions = self._positions
+        for key, value in row_data.items():
+            if self.coerce_strings and isinstance(value, str):
+                observed = string_type(value)
+            else:
+                observed = value_type(value)
+            column_types[key] = merge_types(column_types.get(key), observed)
+            if key not in positions:
+                positions[key] = len(self.columns)
+                self.columns.append(key)
+
+        if self.blob_store is not None:
+            # After type inference, so offloaded cells keep their column's type
+            row_data = {key: self.blob_store.offload(value) for key, value in row_data.items()}
+
+        if self.content_format == CONTENT_FORMAT_OBJECT:
+            return json.dumps(row_data, default=_json_default)
+
+        values = [None] * len(self.columns)
+        for key, value in row_data.items():
+            values[positions[key]] = value
+        return json.dumps(values, default=_json_default)
+
+    def encode_rows(self, rows: Iterable[dict]) -> Iterator[dict]:
+        """Encode parsed rows, replacing their data with stored content."""
+        for row in rows:
+            yield {
+                "row_index": row["row_index"],
+                "content": self.encode(row["data"]),
+                "content_hash": row["content_hash"]
+            }
+
+    def merge_column_types(self, column_types: Dict[str, Optional[str]]) -> None:
+        """Fold in types observed by another encoder (e.g. a worker process)."""
+        for column, observed in column_types.items():
+            self.column_types[column] = merge_types(self.column_types.get(column), observed)
+
+    def get_column_types(self) -> Dict[str, str]:
+        """Inferred type of every column; columns with no values are text."""
+        return {column: self.column_types.get(column) or "text" for column in self.columns}
+
+
+def decode_content(
+    content: str,
+    columns: List[str],
+    column_types: Optional[Dict[str, str]] = None
+) -> dict:
+    """Decode stored row content in either format to a dict.
+
+    Args:
+        content: Stored content JSON
+        columns: Session column list
+        column_types: Session column types; string cells of int, float and
+            bool columns are converted. Leave out to get values as stored.
+    """
+    values = json.loads(content)
+    data = values if isinstance(values, dict) else dict(zip(columns, values))
+    if column_types:
+        for column, value in data.items():
+            if isinstance(value, str):
+                data[column] = coerce_value(value, column_types.get(column))
+    return data
+
+
+def session_column_types(session) -> Optional[Dict[str, str]]:
+    """A session's stored column types, or None for sessions without them."""
+    return json.loads(session.column_types) if session.column_types else None
+
+
+def get_session_encoder(session, coerce_strings: bool = False, blob_store=None) -> RowEncoder:
+    """Encoder for adding rows to an existing session.
+
+    Rows added to object-format sessions keep their values as parsed, so
+    they stay consistent with the session's existing rows.
+    """
+    content_format = session.content_format or CONTENT_FORMAT_OBJECT
+    return RowEncoder(
+        json.loads(session.columns),
+        column_types=session_column_types(session),
+        content_format=content_format,
+        coerce_strings=coerce_strings and content_format == CONTENT_FORMAT_COLUMNAR,
+        blob_store=blob_store
+    )
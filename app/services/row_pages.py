@@ -0,0 +1,312 @@
+"""
+Assembly of data row pages with their ratings.
+
+A page is built from a fixed number of set-based queries: the rows
+themselves, then every rating on those rows joined to its rater's username.
+Query count doesn't grow with page size or with the number of raters per
+row, unlike lazy-loading row.ratings and rating.rater per row.
+
+Pages are rendered straight to JSON bytes rather than through response
+models. Stored JSON (object-format row content, rating responses) is
+spliced into the output as is; only ids, metadata and columnar content,
+which needs its column names attached, are serialized per request.
+Rendered content is kept in the row content cache, so rows of busy
+sessions are served without reading or decoding content again.
+
+Pages can also be addressed by opaque cursors keyed on row_index, which
+seek through the (session_id, row_index) index instead of walking an
+OFFSET, so deep pages cost the same as the first.
+"""
+
+import base64
+import binascii
+import json
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import Response
+from sqlalchemy import exists
+from sqlalchemy.orm import Query, Session, load_only
+
+from ..models import DataRow, Rating, User
+from .row_cache import Projection, row_cache
+from .row_codec import decode_content
+
+
+def rated_by(rater_id: str):
+    """EXISTS clause for rows the rater has rated.
+
+    Correlated on the row id, so each probe is a lookup in the
+    (data_row_id, rater_id) unique index rather than a scan of the
+    rater's ratings.
+    """
+    return exists().where(
+        Rating.data_row_id == DataRow.id,
+        Rating.rater_id == rater_id
+    )
+
+
+def dumps(value) -> bytes:
+    """Serialize a value with orjson, falling back to json for what it rejects.
+
+    orjson refuses integers beyond 64 bits, which JSONL uploads can contain.
+    """
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        return json.dumps(value).encode("utf-8")
+
+
+def resolve_projection(
+    columns: List[str],
+    fields: Optional[str],
+    exclude: Optional[str]
+) -> Projection:
+    """Columns to return from comma-separated fields and exclude lists.
+
+    Returns:
+        Selected columns in session column order, or None for all columns
+    """
+    if not fields and not exclude:
+        return None
+
+    requested = {name.strip() for name in (fields or "").split(",") if name.strip()}
+    excluded = {name.strip() for name in (exclude or "").split(",") if name.strip()}
+    unknown = (requested | excluded) - set(columns)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown column(s): {', '.join(sorted(unknown))}")
+
+    return tuple(
+        column for column in columns
+        if (not fields or column in requested) and column not in excluded
+    )
+
+
+def render_content(
+    content: str,
+    columns: List[str],
+    projection: Projection = None,
+    column_types: Optional[Dict[str, str]] = None
+) -> bytes:
+    """JSON object bytes of a row's stored content, optionally projected."""
+    if projection is not None:
+        data = decode_content(content, columns, column_types)
+        return dumps({column: data[column] for column in projection if column in data})
+    if content.startswith("{"):
+        # Object-format rows are stored with their values already typed
+        return content.encode("utf-8")
+    return dumps(decode_content(content, columns, column_types))
+
+
+def get_row_contents(
+    db: Session,
+    session_id: str,
+    row_indexes: List[int],
+    columns: List[str],
+    projection: Projection = None,
+    column_types: Optional[Dict[str, str]] = None,
+    cache_generation: Optional[int] = None
+) -> Dict[int, bytes]:
+    """Rendered content of a session's rows, from the cache where possible.
+
+    Args:
+        cache_generation: row_cache generation read before the session was
+            loaded; rows rendered from an outdated session aren't cached
+
+    Returns:
+        Mapping of row_index to JSON object bytes
+    """
+    contents = row_cache.get_many(session_id, row_indexes, projection)
+    missing = [row_index for row_index in row_indexes if row_index not in contents]
+    if missing:
+        loaded = {
+            row_index: render_content(content, columns, projection, column_types)
+            for row_index, content in db.query(DataRow.row_index, DataRow.content).filter(
+                DataRow.session_id == session_id,
+                DataRow.row_index.in_(missing)
+            )
+        }
+        row_cache.put_many(session_id, loaded, projection, cache_generation)
+        contents.update(loaded)
+    return contents
+
+
+def render_rating(rating: Rating, rater_username: Optional[str]) -> bytes:
+    """JSON bytes of a rating, in the shape of RatingResponse."""
+    fields = dumps({
+        "id": str(rating.id),
+        "rating_value": rating.rating_value,
+        "comment": rating.comment,
+        "rated_at": rating.rated_at,
+        "rater_id": rating.rater_id,
+        "rater_username": rater_username,
+    })
+    response = rating.response.encode("utf-8") if rating.response else b"null"
+    return fields[:-1] + b',"response":' + response + b"}"
+
+
+def get_ratings_by_row(
+    db: Session,
+    row_ids: List,
+    rater_id: Optional[str] = None
+) -> Dict[object, List[Tuple[str, bytes]]]:
+    """Fetch and render all ratings for a set of rows with one query.
+
+    Args:
+        db: Database session
+        row_ids: Rows to fetch ratings for
+        rater_id: Only fetch this rater's ratings
+
+    Returns:
+        Mapping of data row id to (rater_id, rating JSON) pairs
+    """
+    ratings_by_row = defaultdict(list)
+    if not row_ids:
+        return ratings_by_row
+
+    results = db.query(Rating, User.username).outerjoin(
+        User, User.id == Rating.rater_id
+    ).filter(
+        Rating.data_row_id.in_(row_ids)
+    )
+    if rater_id is not None:
+        results = results.filter(Rating.rater_id == rater_id)
+    results = results.order_by(Rating.rated_at)
+
+    for rating, rater_username in results:
+        ratings_by_row[rating.data_row_id].append(
+            (rating.rater_id, render_rating(rating, rater_username))
+        )
+    return ratings_by_row
+
+
+def render_row_page(
+    db: Session,
+    session_id: str,
+    rows: List[DataRow],
+    columns: List[str],
+    current_user_id: str,
+    projection: Projection = None,
+    only_own_ratings: bool = False,
+    column_types: Optional[Dict[str, str]] = None,
+    cache_generation: Optional[int] = None
+) -> bytes:
+    """Render a page of rows, including their ratings, as a JSON array.
+
+    Args:
+        db: Database session
+        session_id: Session the rows belong to
+        rows: The page of rows, in display order; only id and row_index are read
+        columns: Session column list used to decode columnar content
+        current_user_id: User whose rating is returned as my_rating
+        projection: Content columns to include (see resolve_projection)
+        only_own_ratings: Leave other raters' ratings out of each row
+        column_types: Session column types, to convert string cells (see decode_content)
+        cache_generation: row_cache generation read before the session was loaded
+
+    Returns:
+        JSON array of DataRowResponse objects in the same order as rows
+    """
+    contents = get_row_contents(
+        db, session_id, [row.row_index for row in rows], columns, projection, column_types,
+        cache_generation
+    )
+    ratings_by_row = get_ratings_by_row(
+        db, [row.id for row in rows], current_user_id if only_own_ratings else None
+    )
+
+    items = []
+    for row in rows:
+        row_ratings = ratings_by_row.get(row.id, [])
+        my_rating = next((rendered for rater_id, rendered in row_ratings if rater_id == current_user_id), b"null")
+        items.append(b"".join((
+            b'{"id":', dumps(str(row.id)),
+            b',"row_index":', str(row.row_index).encode("ascii"),
+            b',"content":', contents[row.row_index],
+            b',"ratings":[', b",".join(rendered for _, rendered in row_ratings),
+            b'],"my_rating":', my_rating,
+            b"}"
+        )))
+    return b"[" + b",".join(items) + b"]"
+
+
+def row_page_response(items: bytes, **fields) -> Response:
+    """JSON response with pre-rendered items plus serialized page fields."""
+    return Response(
+        content=b'{"items":' + items + b"," + dumps(fields)[1:],
+        media_type="application/json"
+    )
+
+
+def encode_cursor(session_id: str, direction: str, row_index: int) -> str:
+    """Build an opaque cursor for the rows after or before row_index."""
+    payload = json.dumps({"s": session_id, "d": direction, "r": row_index}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, session_id: str) -> Tuple[str, int]:
+    """Parse a cursor issued for this session.
+
+    Returns:
+        Tuple of (direction, row_index) where direction is "after" or "before"
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        direction, row_index = payload["d"], int(payload["r"])
+        valid = payload["s"] == session_id and direction in ("after", "before")
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return direction, row_index
+
+
+def page_query(db: Session, session_id: str) -> Query:
+    """Query for a session's rows that leaves content to the row cache."""
+    return db.query(DataRow).options(load_only(DataRow.id, DataRow.row_index)).filter(
+        DataRow.session_id == session_id
+    )
+
+
+def fetch_cursor_page(
+    query: Query,
+    session_id: str,
+    cursor: Optional[str],
+    per_page: int
+) -> Tuple[List[DataRow], Optional[str], Optional[str]]:
+    """Fetch one page of rows by keyset on row_index.
+
+    Args:
+        query: Row query already filtered to the session (and any rating filter)
+        session_id: Session the cursor must belong to
+        cursor: Token from a previous page, or None/empty for the first page
+        per_page: Rows per page
+
+    Returns:
+        Tuple of (rows in row_index order, next_cursor, prev_cursor)
+    """
+    direction, row_index = decode_cursor(cursor, session_id) if cursor else ("after", None)
+
+    if direction == "after":
+        if row_index is not None:
+            query = query.filter(DataRow.row_index > row_index)
+        rows = query.order_by(DataRow.row_index).limit(per_page + 1).all()
+        has_next, has_prev = len(rows) > per_page, row_index is not None
+        rows = rows[:per_page]
+    else:
+        rows = query.filter(DataRow.row_index < row_index).order_by(
+            DataRow.row_index.desc()
+        ).limit(per_page + 1).all()
+        has_next, has_prev = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+
+    if not rows:
+        return rows, None, None
+
+    next_cursor = encode_cursor(session_id, "after", rows[-1].row_index) if has_next else None
+    prev_cursor = encode_cursor(session_id, "before", rows[0].row_index) if has_prev else None
+    return rows, next_cursor, prev_cursor
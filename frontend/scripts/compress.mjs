@@ -0,0 +1,44 @@
+// Writes .br and .gz siblings next to the built files in dist/ so the
+// server can send them precompressed instead of compressing per request.
+import { readdirSync, readFileSync, statSync, writeFileSync } from 'node:fs';
+import { extname, join } from 'node:path';
+import { fileURLToPath } from 'node:url';
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib';
+
+const DIST_DIR = fileURLToPath(new URL('../dist/', import.meta.url));
+const COMPRESSIBLE = new Set(['.js', '.css', '.html', '.svg', '.json', '.map', '.txt']);
+const MIN_BYTES = 1024;
+
+function* walk(dir) {
+  for (const entry of readdirSync(dir, { withFileTypes: true })) {
+    const path = join(dir, entry.name);
+    if (entry.isDirectory()) {
+      yield* walk(path);
+    } else if (COMPRESSIBLE.has(extname(entry.name))) {
+      yield path;
+    }
+  }
+}
+
+let written = 0;
+for (const path of walk(DIST_DIR)) {
+  if (statSync(path).size < MIN_BYTES) continue;
+  const data = readFileSync(path);
+  const variants = {
+    '.br': brotliCompressSync(data, {
+      params: {
+        [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+        [constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+      },
+    }),
+    '.gz': gzipSync(data, { level: 9 }),
+  };
+  for (const [suffix, compressed] of Object.entries(variants)) {
+    // Only worth serving if it is actually smaller
+    if (compressed.length < data.length) {
+      writeFileSync(path + suffix, compressed);
+      written++;
+    }
+  }
+}
+console.log(`compress: wrote ${written} precompressed files`);
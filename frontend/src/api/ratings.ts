@@ -1,7 +1,12 @@
 import apiClient from './client';
-import { Rating, RatingCreate } from '@/types';
+import { Rating, RatingBatchResponse, RatingCreate } from '@/types';
 
 export async function createOrUpdateRating(data: RatingCreate): Promise<Rating> {
   const response = await apiClient.post<Rating>('/ratings', data);
   return response.data;
 }
+
+export async function createOrUpdateRatingsBatch(ratings: RatingCreate[]): Promise<RatingBatchResponse> {
+  const response = await apiClient.post<RatingBatchResponse>('/ratings/batch', { ratings });
+  return response.data;
+}
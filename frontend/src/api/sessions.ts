@@ -27,6 +27,14 @@ export async function getSessionRows(
   return response.data;
 }
 
+export async function getRowCell(sessionId: string, rowId: string, column: string): Promise<string> {
+  const response = await apiClient.get<string>(
+    `/sessions/${sessionId}/rows/${rowId}/cells/${encodeURIComponent(column)}`,
+    { responseType: 'text', transformResponse: (data) => data }
+  );
+  return response.data;
+}
+
 export async function uploadFile(
   projectId: string,
   file: File,
@@ -0,0 +1,57 @@
+import { useState } from 'react';
+import { Button } from '@/components/common';
+import { getRowCell } from '@/api';
+import { detectMediaType, formatFileSize } from '@/utils/contentDetection';
+import { MediaRenderer } from './MediaRenderer';
+
+interface LargeCellProps {
+  sessionId: string;
+  rowId: string;
+  column: string;
+  size: number;
+}
+
+// Cells above the server's inline size limit arrive as blob://<sha256>/<size>
+// references and are fetched only when the rater asks for them.
+export function parseBlobRef(value: unknown): { size: number } | null {
+  if (typeof value !== 'string') return null;
+  const match = value.match(/^blob:\/\/[0-9a-f]{64}\/(\d+)$/);
+  return match ? { size: Number(match[1]) } : null;
+}
+
+export function LargeCell({ sessionId, rowId, column, size }: LargeCellProps) {
+  const [value, setValue] = useState<string | null>(null);
+  const [isLoading, setIsLoading] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+
+  const load = async () => {
+    setIsLoading(true);
+    setError(null);
+    try {
+      setValue(await getRowCell(sessionId, rowId, column));
+    } catch {
+      setError('Failed to load value');
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
+  if (value === null) {
+    return (
+      <div className="flex items-center gap-3">
+        <span className="text-sm text-gray-500">Large value ({formatFileSize(size)})</span>
+        <Button size="sm" variant="secondary" onClick={load} isLoading={isLoading}>
+          Load
+        </Button>
+        {error && <span className="text-sm text-red-600">{error}</span>}
+      </div>
+    );
+  }
+
+  const media = detectMediaType(value);
+  return media ? (
+    <MediaRenderer media={media} className="max-w-full" />
+  ) : (
+    <div className="text-gray-900 whitespace-pre-wrap break-words">{value}</div>
+  );
+}
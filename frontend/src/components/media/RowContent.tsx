@@ -1,12 +1,16 @@
 import { MediaRenderer } from './MediaRenderer';
+import { LargeCell, parseBlobRef } from './LargeCell';
 import { parseRowContent } from '@/utils/contentDetection';
 
 interface RowContentProps {
   content: Record<string, unknown>;
   columns?: string[];
+  // Needed to fetch cells stored out of line
+  sessionId?: string;
+  rowId?: string;
 }
 
-export function RowContent({ content, columns }: RowContentProps) {
+export function RowContent({ content, columns, sessionId, rowId }: RowContentProps) {
   const parsedContent = parseRowContent(content);
 
   // If columns are specified, order by them
@@ -23,6 +27,7 @@ export function RowContent({ content, columns }: RowContentProps) {
 
         const { key, value, media } = item;
         const stringValue = typeof value === 'string' ? value : JSON.stringify(value);
+        const blobRef = parseBlobRef(value);
 
         return (
           <div key={key} className="border-b border-gray-100 pb-4 last:border-0 last:pb-0">
@@ -30,7 +35,9 @@ export function RowContent({ content, columns }: RowContentProps) {
               {key}
             </label>
 
-            {media ? (
+            {blobRef && sessionId && rowId ? (
+              <LargeCell sessionId={sessionId} rowId={rowId} column={key} size={blobRef.size} />
+            ) : media ? (
               <MediaRenderer media={media} className="max-w-full" />
             ) : (
               <div className="text-gray-900 whitespace-pre-wrap break-words">
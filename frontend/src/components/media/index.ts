@@ -6,3 +6,4 @@ export * from './VimeoEmbed';
 export * from './PDFViewer';
 export * from './MediaRenderer';
 export * from './RowContent';
+export * from './LargeCell';
@@ -50,7 +50,7 @@ export function FileUpload({ isOpen, onClose, onUpload }: FileUploadProps) {
       'application/vnd.ms-excel',
       'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
     ];
-    const validExtensions = ['.csv', '.xls', '.xlsx'];
+    const validExtensions = ['.csv', '.xls', '.xlsx', '.jsonl', '.ndjson', '.parquet', '.arrow', '.feather', '.gz', '.bz2', '.xz', '.zst'];
     const extension = '.' + file.name.split('.').pop()?.toLowerCase();
 
     return validTypes.includes(file.type) || validExtensions.includes(extension);
@@ -133,7 +133,7 @@ export function FileUpload({ isOpen, onClose, onUpload }: FileUploadProps) {
           <input
             ref={inputRef}
             type="file"
-            accept=".csv,.xls,.xlsx"
+            accept=".csv,.xls,.xlsx,.jsonl,.ndjson,.parquet,.arrow,.feather,.gz,.bz2,.xz,.zst"
             onChange={handleFileChange}
             className="hidden"
           />
@@ -97,7 +97,12 @@ export function SessionPreview({
 
             {/* Content */}
             <div className="max-h-[60vh] overflow-y-auto">
-              <RowContent content={currentRow.content} columns={columns} />
+              <RowContent
+                content={currentRow.content}
+                columns={columns}
+                sessionId={sessionId}
+                rowId={currentRow.id}
+              />
             </div>
 
             {/* Existing Ratings Summary */}
@@ -342,7 +342,12 @@ export function RatingPage() {
                 <h3 className="font-medium text-gray-900">Item Content</h3>
                 <Badge>#{currentRow.row_index + 1}</Badge>
               </div>
-              <RowContent content={currentRow.content} columns={session.columns} />
+              <RowContent
+                content={currentRow.content}
+                columns={session.columns}
+                sessionId={sessionId}
+                rowId={currentRow.id}
+              />
 
               {/* Other Raters */}
               {currentRow.ratings.filter((r) => r.id !== currentRow.my_rating?.id).length > 0 && (
@@ -76,6 +76,20 @@ export interface RatingCreate {
   time_spent_ms?: number;
 }
 
+export interface RatingBatchItemResult {
+  index: number;
+  status: 'created' | 'updated' | 'error';
+  rating?: Rating;
+  error?: string;
+}
+
+export interface RatingBatchResponse {
+  created: number;
+  updated: number;
+  failed: number;
+  results: RatingBatchItemResult[];
+}
+
 export interface UploadResponse {
   session_id: string;
   session_name: string;
@@ -0,0 +1,86 @@
+"""Shared fixtures: the app on a throwaway data directory, plus users, projects and sessions."""
+
+import os
+import tempfile
+import uuid
+
+# Settings are read at import time, so point them at a temp directory first
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="hitl-tests-")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+PASSWORD = "secret123"
+
+
+def make_client(role: str) -> TestClient:
+    """A started client logged in as a new user with the given role."""
+    client = TestClient(app)
+    client.__enter__()
+    username = f"{role}-{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/api/auth/register", json={"username": username, "password": PASSWORD, "role": role}
+    )
+    assert response.status_code == 200, response.text
+    response = client.post("/api/auth/login", json={"username": username, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    client.user = client.get("/api/auth/me").json()
+    return client
+
+
+@pytest.fixture
+def requester():
+    client = make_client("requester")
+    yield client
+    client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def make_rater():
+    """Factory for rater clients; all are closed after the test."""
+    clients = []
+
+    def factory() -> TestClient:
+        client = make_client("rater")
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def project(requester):
+    response = requester.post("/api/projects/", json={"name": f"project-{uuid.uuid4().hex[:8]}"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def assign(requester: TestClient, project: dict, *raters: TestClient) -> None:
+    """Assign raters to a project."""
+    response = requester.post(
+        f"/api/projects/{project['id']}/assign",
+        json={"rater_ids": [rater.user["id"] for rater in raters]}
+    )
+    assert response.status_code == 200, response.text
+
+
+def upload_csv(requester: TestClient, project: dict, row_count: int) -> str:
+    """Upload a CSV with row_count rows; returns the session id."""
+    body = "id,text\n" + "".join(f"{i},row {i}\n" for i in range(row_count))
+    response = requester.post(
+        f"/api/projects/{project['id']}/upload",
+        files={"file": ("data.csv", body.encode("utf-8"), "text/csv")}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["session_id"]
+
+
+def row_ids(client: TestClient, session_id: str) -> list:
+    """Ids of a session's rows in row_index order."""
+    response = client.get(f"/api/sessions/{session_id}/rows", params={"per_page": 100})
+    assert response.status_code == 200, response.text
+    return [row["id"] for row in response.json()["items"]]
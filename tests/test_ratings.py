@@ -0,0 +1,69 @@
+"""Concurrent rating submissions for the same rows."""
+
+import threading
+
+from sqlalchemy import func
+
+from app.database import SessionLocal, reconcile_counters
+from app.models import Rating
+
+from conftest import assign, row_ids, upload_csv
+
+THREADS_PER_RATER = 4
+SUBMISSIONS_PER_THREAD = 15
+
+
+def test_concurrent_submissions_upsert_one_rating_per_rater(requester, project, make_rater):
+    raters = [make_rater() for _ in range(3)]
+    assign(requester, project, *raters)
+    session_id = upload_csv(requester, project, 20)
+    # Every thread hammers the same few rows
+    rows = row_ids(raters[0], session_id)[:4]
+
+    statuses = []
+    statuses_lock = threading.Lock()
+    start = threading.Barrier(len(raters) * THREADS_PER_RATER)
+
+    def submit(rater, thread_number: int) -> None:
+        results = []
+        start.wait()
+        for i in range(SUBMISSIONS_PER_THREAD):
+            if i % 3 == 0:
+                response = rater.post("/api/ratings/batch", json={"ratings": [
+                    {"data_row_id": row_id, "session_id": session_id, "rating_value": i % 5}
+                    for row_id in rows
+                ]})
+            else:
+                response = rater.post("/api/ratings", json={
+                    "data_row_id": rows[(thread_number + i) % len(rows)],
+                    "session_id": session_id,
+                    "rating_value": i % 5
+                })
+            results.append((response.status_code, response.text))
+        with statuses_lock:
+            statuses.extend(results)
+
+    threads = [
+        threading.Thread(target=submit, args=(rater, number))
+        for rater in raters
+        for number in range(THREADS_PER_RATER)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(statuses) == len(threads) * SUBMISSIONS_PER_THREAD
+    assert [text for status, text in statuses if status != 200] == []
+
+    db = SessionLocal()
+    try:
+        per_pair = db.query(Rating.data_row_id, Rating.rater_id, func.count(Rating.id)).filter(
+            Rating.session_id == session_id
+        ).group_by(Rating.data_row_id, Rating.rater_id).all()
+    finally:
+        db.close()
+    assert len(per_pair) == len(rows) * len(raters)
+    assert all(count == 1 for _, _, count in per_pair)
+
+    assert reconcile_counters() == 0
@@ -0,0 +1,65 @@
+"""Row pages are built with a fixed number of queries."""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database import engine
+from app.services.row_cache import row_cache
+
+from conftest import assign, row_ids, upload_csv
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed on the engine inside the block."""
+    counter = {"queries": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def page_queries(client, session_id: str, per_page: int) -> int:
+    """Queries run by one uncached page request."""
+    # Content would otherwise come from the cache after the first request
+    row_cache.invalidate_session(session_id)
+    with count_queries() as counter:
+        response = client.get(f"/api/sessions/{session_id}/rows", params={"per_page": per_page})
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == per_page
+    return counter["queries"]
+
+
+def test_query_count_does_not_grow_with_page_size(requester, project, make_rater):
+    rater = make_rater()
+    assign(requester, project, rater)
+    session_id = upload_csv(requester, project, 30)
+    # Warm up per-process state such as the progress bitmaps
+    page_queries(rater, session_id, 5)
+
+    assert page_queries(rater, session_id, 5) == page_queries(rater, session_id, 30)
+
+
+def test_query_count_does_not_grow_with_raters_per_row(requester, project, make_rater):
+    raters = [make_rater() for _ in range(3)]
+    assign(requester, project, *raters)
+    session_id = upload_csv(requester, project, 10)
+    page_queries(raters[0], session_id, 10)
+    unrated = page_queries(raters[0], session_id, 10)
+
+    for rater in raters:
+        for row_id in row_ids(rater, session_id):
+            response = rater.post(
+                "/api/ratings", json={"data_row_id": row_id, "session_id": session_id, "rating_value": 3}
+            )
+            assert response.status_code == 200, response.text
+
+    response = raters[0].get(f"/api/sessions/{session_id}/rows", params={"per_page": 10})
+    assert all(len(row["ratings"]) == len(raters) for row in response.json()["items"])
+    assert page_queries(raters[0], session_id, 10) == unrated